@@ -1,5 +1,18 @@
 __version__ = "0.5.8"
 
-from .intelisys import Intelisys, safe_json_loads
+from .intelisys import (
+    Intelisys, safe_json_loads, configure_client_pool, clear_client_pool,
+    RateLimiter, set_rate_limit, BatchResult, ResponseCache,
+    get_coalescing_stats, StreamSink, TerminalSink, CallbackSink, FileSink, QueueSink,
+    JSONStreamParser, llm_repair_json, set_json_backend, safe_json_loads_async, llm_repair_json_async,
+    HTTPCache, configure_http,
+)
 
-__all__ = ["Intelisys", "safe_json_loads"]
+__all__ = [
+    "Intelisys", "safe_json_loads", "configure_client_pool", "clear_client_pool",
+    "RateLimiter", "set_rate_limit", "BatchResult", "ResponseCache",
+    "get_coalescing_stats", "StreamSink", "TerminalSink", "CallbackSink", "FileSink", "QueueSink",
+    "JSONStreamParser", "llm_repair_json", "set_json_backend", "safe_json_loads_async",
+    "llm_repair_json_async",
+    "HTTPCache", "configure_http",
+]
@@ -13,31 +13,36 @@ Example usage for image OCR:
     )
     result
 """
+from __future__ import annotations
+
 import re
 import ast
 import json
 import os
 import base64
 import io
-import requests
-from typing import Dict, Optional, Union, Tuple, Any, Type
+import queue
+import copy
+import inspect
+import asyncio
+import threading
+import weakref
+import hashlib
+from collections import deque, OrderedDict
+import random
+import time
+from typing import Dict, Optional, Union, Tuple, Any, Type, List, Iterable, Iterator, NamedTuple, AsyncIterator, TYPE_CHECKING
 from contextlib import contextmanager
-from PIL import Image
-from anthropic import Anthropic, AsyncAnthropic
-from jinja2 import Template
-from openai import AsyncOpenAI, OpenAI
+from concurrent.futures import ThreadPoolExecutor, Future
 from termcolor import colored
 import logging
-from pydantic import BaseModel, ValidationError
 from functools import lru_cache
-import PyPDF2
-from bs4 import BeautifulSoup
-import xml.etree.ElementTree as ET
-from pptx import Presentation
-from openpyxl import load_workbook
-from docx import Document
-import email
-import chardet
+
+# Document parsers, provider SDKs, HTTP and templating libraries are imported
+# on first use inside the methods that need them, so ``import intelisys`` stays
+# cheap for workers that only ever talk to a single provider.
+if TYPE_CHECKING:
+    from pydantic import BaseModel
 
 # Define the log format
 DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
@@ -50,6 +55,81 @@ logging.basicConfig(level=logging.WARNING, datefmt=DATETIME_FORMAT, format=LOG_F
 logger = logging.getLogger("Global")
 logger.setLevel(logging.INFO)
 
+_json_backend: Optional[Tuple[str, Any, Any]] = None
+
+def _stdlib_json_dumps(obj: Any, sort_keys: bool = False) -> str:
+    return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def set_json_backend(name: Optional[str] = None) -> str:
+    """
+    Select the JSON library used for response parsing, streamed JSON and cached values.
+
+    Cache keys are always serialized with the standard library, since the backends format some
+    values differently (orjson writes 1e16 where json writes 1e+16).
+
+    Args:
+        name (str, optional): "orjson", "ujson" or "json". None picks the fastest installed one.
+
+    Returns:
+        str: The name of the selected backend.
+    """
+    global _json_backend
+    candidates = [name] if name else ["orjson", "ujson", "json"]
+    for candidate in candidates:
+        if candidate == "json":
+            _json_backend = ("json", json.loads, _stdlib_json_dumps)
+        elif candidate == "orjson":
+            try:
+                import orjson
+            except ImportError:
+                if name:
+                    raise ImportError("The 'orjson' JSON backend requires the orjson package: pip install orjson")
+                continue
+            def orjson_dumps(obj: Any, sort_keys: bool = False) -> str:
+                option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+                return orjson.dumps(obj, default=str, option=option).decode("utf-8")
+            _json_backend = ("orjson", orjson.loads, orjson_dumps)
+        elif candidate == "ujson":
+            try:
+                import ujson
+            except ImportError:
+                if name:
+                    raise ImportError("The 'ujson' JSON backend requires the ujson package: pip install ujson")
+                continue
+            def ujson_dumps(obj: Any, sort_keys: bool = False) -> str:
+                return ujson.dumps(obj, sort_keys=sort_keys, ensure_ascii=False, escape_forward_slashes=False,
+                                   default=str)
+            _json_backend = ("ujson", ujson.loads, ujson_dumps)
+        else:
+            raise ValueError(f"Unknown JSON backend: {candidate!r}. Use 'orjson', 'ujson' or 'json'.")
+        return candidate
+
+def json_loads(text: Union[str, bytes]) -> Any:
+    """
+    Parse JSON with the selected backend.
+
+    Input the fast backend rejects (NaN/Infinity literals, lone surrogates) is re-parsed with the
+    standard library, so results and errors always match json.loads.
+    """
+    if _json_backend is None:
+        set_json_backend()
+    try:
+        return _json_backend[1](text)
+    except ValueError:
+        if _json_backend[0] == "json":
+            raise
+    return json.loads(text)
+
+def json_dumps(obj: Any, sort_keys: bool = False) -> str:
+    """Serialize ``obj`` to compact, non-ASCII-escaped JSON with the selected backend."""
+    if _json_backend is None:
+        set_json_backend()
+    try:
+        return _json_backend[2](obj, sort_keys)
+    except (TypeError, OverflowError):
+        # Values the fast backend cannot encode, e.g. integers wider than 64 bits
+        return _stdlib_json_dumps(obj, sort_keys)
+
 def remove_preface(text: str) -> str:
     """Remove any prefaced text before the start of JSON content."""
     match: Optional[re.Match] = re.search(r"[\{\[]", text)
@@ -73,69 +153,1526 @@ def locate_json_error(json_str: str, error_msg: str) -> Tuple[int, int, str]:
     pointer = f"{' ' * min(20, col_no - 1)}^"
     return line_no, col_no, f"{context}\n{pointer}"
 
+_CODE_FENCE_RE = re.compile(r"```(?:json|JSON|javascript|js)?[ \t]*\n?(.*?)(?:```|$)", re.S)
+_JSON_START_RE = re.compile(r"[\{\[]")
+_JSON_LITERALS = {"True": "true", "False": "false", "None": "null", "true": "true", "false": "false",
+                  "null": "null", "NaN": "NaN", "Infinity": "Infinity"}
+_STRING_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+def _drop_trailing_comma(out: List[str]):
+    while out and not out[-1].strip():
+        out.pop()
+    if out and out[-1].rstrip().endswith(","):
+        out[-1] = out[-1].rstrip()[:-1]
+
+def repair_json(text: str) -> str:
+    """
+    Repair common defects of LLM-produced JSON locally, without any model call.
+
+    Handles markdown code fences and surrounding prose, single-quoted strings, Python
+    literals (True/False/None), unquoted object keys, trailing commas, // and /* */ comments,
+    raw newlines inside strings, mismatched closing brackets, and output truncated before
+    its closing quotes or brackets. Bare words are only quoted in key position; a bare value that
+    is not a literal means the text is prose rather than JSON, and it is returned unrepaired.
+    The result is not guaranteed to be valid JSON.
+
+    Usage:
+        json.loads(repair_json("```json\n{'a': True, 'b': [1, 2,]\n```"))  # {"a": True, "b": [1, 2]}
+    """
+    original = text
+    fence = _CODE_FENCE_RE.search(text)
+    # A lone closing fence (the opening one already stripped) matches with an empty body
+    if fence and _JSON_START_RE.search(fence.group(1)):
+        text = fence.group(1)
+    text = remove_preface(text)
+    out: List[str] = []
+    # Expected closers of the open containers, and for objects whether a key comes next
+    stack: List[str] = []
+    expect_key: List[bool] = []
+    last_was_key = False
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        in_object = bool(stack) and stack[-1] == "}"
+        if ch in "\"'":
+            piece = ['"']
+            i += 1
+            while i < n and text[i] != ch:
+                c = text[i]
+                if c == "\\" and i + 1 < n:
+                    piece.append("'" if text[i + 1] == "'" else text[i:i + 2])
+                    i += 2
+                    continue
+                piece.append('\\"' if c == '"' else _STRING_ESCAPES.get(c, c))
+                i += 1
+            piece.append('"')
+            out.append("".join(piece))
+            last_was_key = in_object and expect_key[-1]
+            i += 1
+            continue
+        if ch == "/" and text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        if ch == "/" and text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        if ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            expect_key.append(ch == "{")
+            out.append(ch)
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            if stack:
+                out.append(stack.pop())
+                expect_key.pop()
+            if not stack:
+                break
+        elif ch == ":" and in_object:
+            expect_key[-1] = False
+            out.append(ch)
+        elif ch == "," and in_object:
+            expect_key[-1] = True
+            out.append(ch)
+        elif ch.isdigit() or ch == "-":
+            j = i + 1
+            while j < n and (text[j].isdigit() or text[j] in ".eE+-"):
+                j += 1
+            out.append(text[i:j])
+            last_was_key = False
+            i = j
+            continue
+        elif ch.isalpha() or ch == "_":
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            if in_object and expect_key[-1]:
+                out.append(json.dumps(word))
+                last_was_key = True
+            else:
+                if j == n and word not in _JSON_LITERALS:
+                    # Output truncated inside a literal, e.g. {"a": tru
+                    word = next((literal for literal in _JSON_LITERALS if literal.startswith(word)), word)
+                if word not in _JSON_LITERALS:
+                    # e.g. "The options are [A] and [B]": prose, not data
+                    return original
+                out.append(_JSON_LITERALS[word])
+                last_was_key = False
+            i = j
+            continue
+        else:
+            out.append(ch)
+        if not ch.isspace():
+            last_was_key = False
+        i += 1
+
+    if stack:
+        # Truncated output: drop a dangling key, complete a dangling value and close everything
+        _drop_trailing_comma(out)
+        while out and not out[-1].strip():
+            out.pop()
+        if last_was_key and stack[-1] == "}":
+            out.pop()
+            _drop_trailing_comma(out)
+        elif out and out[-1].rstrip().endswith(":"):
+            out.append("null")
+        while stack:
+            _drop_trailing_comma(out)
+            out.append(stack.pop())
+    return "".join(out)
+
+JSON_REPAIR_SYSTEM_MESSAGE = ("Convert the user's text into valid JSON. If it is already valid JSON, return it as is. "
+                              "Reply with the JSON only.")
+
+def _parse_json_candidate(text: Any) -> Optional[Union[Dict, List]]:
+    """Return ``text`` parsed as a JSON object or array (after local repair), or None."""
+    if isinstance(text, (dict, list)):
+        return text
+    if not isinstance(text, str):
+        return None
+    for candidate in (text, repair_json(text)):
+        try:
+            parsed = json_loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(parsed, (dict, list)):
+            return parsed
+    return None
+
+_default_repairer = None
+
+def _get_default_json_repairer() -> 'Intelisys':
+    global _default_repairer
+    if _default_repairer is None:
+        _default_repairer = Intelisys(name="JSONRepair", provider="openai", model="gpt-4o-mini")
+    return _default_repairer
+
+def llm_repair_json(json_string: str, repairer=None, max_attempts: int = 3,
+                    timeout: Optional[float] = 60.0) -> Optional[Union[Dict, List]]:
+    """
+    Ask an LLM to turn text into valid JSON, feeding each invalid answer back for another try.
+
+    Args:
+        json_string (str): The malformed JSON text.
+        repairer (Intelisys or callable, optional): The instance whose provider and settings are used,
+            or a callable mapping a prompt to a reply. Defaults to a shared gpt-4o-mini instance.
+        max_attempts (int): Maximum number of LLM calls.
+        timeout (float, optional): Total time budget in seconds across all attempts.
+
+    Returns:
+        dict, list or None: The parsed JSON, or None if no attempt succeeded within the budget.
+    """
+    repairer = repairer or _get_default_json_repairer()
+    deadline = time.monotonic() + timeout if timeout else None
+    candidate = json_string
+    for attempt in range(max_attempts):
+        remaining = deadline - time.monotonic() if deadline is not None else None
+        if remaining is not None and remaining <= 0:
+            logger.warning(f"LLM JSON repair ran out of time after {attempt} attempts")
+            break
+        prompt = f"{'Convert this to JSON' if attempt == 0 else 'Fix this JSON'}:\n{candidate}"
+        if isinstance(repairer, Intelisys):
+            response = repairer._repair_json_call(prompt, remaining)
+        else:
+            response = repairer(prompt)
+        logger.debug(f"LLM JSON repair attempt {attempt + 1} returned: {response}")
+        parsed = _parse_json_candidate(response)
+        if parsed is not None:
+            logger.info(f"LLM JSON repair succeeded on attempt {attempt + 1}")
+            return parsed
+        candidate = response
+    return None
+
+async def llm_repair_json_async(json_string: str, repairer=None, max_attempts: int = 3,
+                                timeout: Optional[float] = 60.0) -> Optional[Union[Dict, List]]:
+    """Asynchronous version of llm_repair_json(); ``repairer`` may also be an async callable."""
+    repairer = repairer or _get_default_json_repairer()
+    deadline = time.monotonic() + timeout if timeout else None
+    candidate = json_string
+    for attempt in range(max_attempts):
+        remaining = deadline - time.monotonic() if deadline is not None else None
+        if remaining is not None and remaining <= 0:
+            logger.warning(f"LLM JSON repair ran out of time after {attempt} attempts")
+            break
+        prompt = f"{'Convert this to JSON' if attempt == 0 else 'Fix this JSON'}:\n{candidate}"
+        if isinstance(repairer, Intelisys):
+            response = await repairer._repair_json_call_async(prompt, remaining)
+        else:
+            response = repairer(prompt)
+            if inspect.isawaitable(response):
+                response = await response
+        logger.debug(f"LLM JSON repair attempt {attempt + 1} returned: {response}")
+        parsed = _parse_json_candidate(response)
+        if parsed is not None:
+            logger.info(f"LLM JSON repair succeeded on attempt {attempt + 1}")
+            return parsed
+        candidate = response
+    return None
+
 def iterative_llm_fix_json(json_string: str, max_attempts: int = 5, intelisys_instance=None) -> str:
+    """Ask an LLM to fix ``json_string``; returns valid JSON text, or the input if every attempt failed."""
     logger.info(f"Starting iterative_llm_fix_json with input: {json_string}")
-    if intelisys_instance is None:
-        intelisys_instance = Intelisys(provider="openai", model="gpt-3.5-turbo", api_key="dummy_key")
-    attempts = 0
-    
-    while attempts < max_attempts:
-        prompt = f"Fix this JSON: {json_string}"
-        logger.debug(f"Sending prompt to AI: {prompt}")
-        response = intelisys_instance.chat(prompt)
-        logger.debug(f"Received response from AI: {response}")
-        
-        try:
-            json.loads(response)  # Try to parse the AI's response
-            logger.info(f"Successfully parsed JSON on attempt {attempts + 1}")
-            return response  # If successful, return the AI's response
-        except json.JSONDecodeError:
-            logger.warning(f"JSON parsing failed on attempt {attempts + 1}")
-            json_string = response  # Update json_string with the AI's response for the next attempt
-        
-        attempts += 1
-    
-    logger.warning(f"Reached max attempts. Returning: {json_string}")
-    return json_string  # Return the last attempt even if it's not valid JSON
+    repaired = llm_repair_json(json_string, intelisys_instance, max_attempts)
+    if repaired is None:
+        logger.warning(f"Reached max attempts. Returning: {json_string}")
+        return json_string
+    return json.dumps(repaired)
 
-def safe_json_loads(json_str: str, error_prefix: str = "") -> Dict:
-    """Safely convert any string input into JSON, with iterative LLM-based error correction."""
+def _local_json_loads(json_str: str, error_prefix: str) -> Tuple[str, Optional[Union[Dict, List]], Optional[str]]:
+    """
+    The LLM-free steps of safe_json_loads: return (cleaned text, parsed JSON or None, repair cache key).
+    """
     if json_str is None:
         raise ValueError(f"{error_prefix}Input is None")
 
     if not isinstance(json_str, str):
         raise TypeError(f"{error_prefix}Input must be a string, not {type(json_str)}")
 
+    # Parse before stripping the preface: remove_preface would also cut an opening code fence
+    parsed = _parse_json_candidate(json_str)
+    if parsed is not None:
+        return json_str, parsed, None
     json_str = remove_preface(json_str)
-    
-    fix_attempts = [
-        json.loads,
-        lambda s: Intelisys(
-            provider="openai", 
-            model="gpt-4o-mini",
-            json_mode=True) \
-            .set_system_message("Convert the following text into valid JSON. If it's already valid JSON, return it as is.") \
-            .chat(f"Convert this to JSON:\n{s}"),
-        iterative_llm_fix_json,
-        lambda s: ast.literal_eval(s) if s.strip().startswith('{') else {"content": s}
-    ]
-    
-    for fix in fix_attempts:
+
+    cache_key = hashlib.sha256(json_str.encode("utf-8")).hexdigest()
+    cached = _json_repair_cache.get(cache_key)
+    if cached is not None:
+        logger.debug(f"{error_prefix}Using cached JSON repair")
+        return json_str, copy.deepcopy(cached), None
+    return json_str, None, cache_key
+
+def _json_loads_fallback(json_str: str, error_prefix: str, cache_key: str,
+                         repaired: Optional[Union[Dict, List]]) -> Union[Dict, List]:
+    """Cache a successful LLM repair, or fall back to a Python literal or {"content": json_str}."""
+    if repaired is not None:
+        _json_repair_cache.set(cache_key, repaired)
+        return copy.deepcopy(repaired)
+
+    if json_str.strip().startswith('{'):
         try:
-            fixed_json = fix(json_str)
-            if isinstance(fixed_json, dict):
-                return fixed_json
-            elif isinstance(fixed_json, str):
-                # If it's still a string, try to parse it as JSON one more time
-                return json.loads(fixed_json)
+            literal = ast.literal_eval(json_str)
+            if isinstance(literal, dict):
+                return literal
         except Exception as e:
             logger.debug(f"{error_prefix}JSON conversion attempt failed: {str(e)}")
-            continue
-    
+
     # If all attempts fail, create a simple JSON object with the original string as content
     logger.warning(f"{error_prefix}Failed to convert to JSON. Creating a simple JSON object.")
     return {"content": json_str}
 
+def safe_json_loads(json_str: str, error_prefix: str = "", repairer=None, max_attempts: int = 3,
+                    timeout: Optional[float] = 60.0) -> Union[Dict, List]:
+    """
+    Safely convert any string input into JSON.
+
+    Tries json.loads, then local repair with repair_json(), then LLM-based repair through
+    ``repairer`` (see llm_repair_json) bounded by ``max_attempts`` calls and ``timeout`` seconds.
+    LLM repairs are cached by a hash of the input.
+    """
+    json_str, parsed, cache_key = _local_json_loads(json_str, error_prefix)
+    if parsed is not None:
+        return parsed
+    try:
+        repaired = llm_repair_json(json_str, repairer, max_attempts, timeout)
+    except Exception as e:
+        logger.debug(f"{error_prefix}LLM JSON repair failed: {str(e)}")
+        repaired = None
+    return _json_loads_fallback(json_str, error_prefix, cache_key, repaired)
+
+async def safe_json_loads_async(json_str: str, error_prefix: str = "", repairer=None, max_attempts: int = 3,
+                                timeout: Optional[float] = 60.0) -> Union[Dict, List]:
+    """Asynchronous version of safe_json_loads(); the LLM repair is awaited (see llm_repair_json_async)."""
+    json_str, parsed, cache_key = _local_json_loads(json_str, error_prefix)
+    if parsed is not None:
+        return parsed
+    try:
+        repaired = await llm_repair_json_async(json_str, repairer, max_attempts, timeout)
+    except Exception as e:
+        logger.debug(f"{error_prefix}LLM JSON repair failed: {str(e)}")
+        repaired = None
+    return _json_loads_fallback(json_str, error_prefix, cache_key, repaired)
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits, server errors
+# and Anthropic's 529 "overloaded".
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+_RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError"}
+
+def _is_retryable_error(error: Exception) -> bool:
+    """Return True if a provider error is transient and the request can be retried."""
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    return any(cls.__name__ in _RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the server-requested delay from the Retry-After(-ms) headers of a provider error."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _backoff_delay(attempt: int, base_delay: float, max_delay: float, retry_after: Optional[float] = None) -> float:
+    """Delay before retry number ``attempt`` (0-based): Retry-After if given, else full-jitter exponential backoff."""
+    if retry_after is not None:
+        return min(retry_after, max_delay)
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+class RateLimiter:
+    """
+    Client-side token-bucket limiter for requests per minute and estimated tokens per minute.
+
+    Callers reserve capacity up front; when a bucket runs dry the caller sleeps until
+    enough capacity has refilled instead of sending a request the provider would reject.
+    The clock and sleep functions are injectable so the limiter can be driven by a fake clock.
+
+    Args:
+        requests_per_minute (float, optional): Request budget per minute. None disables the request bucket.
+        tokens_per_minute (float, optional): Token budget per minute. None disables the token bucket.
+        burst (float, optional): Fraction of a minute's budget that may be spent at once (default 1.0).
+        clock (callable): Monotonic clock returning seconds.
+        sleep (callable): Blocking sleep used by acquire().
+        async_sleep (callable): Coroutine sleep used by acquire_async().
+
+    Usage:
+        limiter = RateLimiter(requests_per_minute=500, tokens_per_minute=200_000)
+        limiter.acquire(tokens=1200)
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 burst: float = 1.0, clock=time.monotonic, sleep=time.sleep, async_sleep=asyncio.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._async_sleep = async_sleep
+        self._lock = threading.Lock()
+        now = clock()
+        # Each bucket is [rate per second, capacity, level, last refill time]
+        self._buckets = {}
+        for name, per_minute in (("requests", requests_per_minute), ("tokens", tokens_per_minute)):
+            if per_minute:
+                capacity = per_minute * burst
+                self._buckets[name] = [per_minute / 60.0, capacity, capacity, now]
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve one request and ``tokens`` tokens; return the seconds to wait before sending."""
+        wanted = {"requests": 1, "tokens": tokens}
+        wait = 0.0
+        with self._lock:
+            now = self._clock()
+            for name, bucket in self._buckets.items():
+                rate, capacity, level, last = bucket
+                level = min(capacity, level + (now - last) * rate)
+                # Requests larger than the whole bucket can never fit; let them drain it instead
+                level -= min(wanted[name], capacity)
+                bucket[2], bucket[3] = level, now
+                if level < 0:
+                    wait = max(wait, -level / rate)
+        return wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until one request and ``tokens`` tokens may be sent. Returns the time waited."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """Asynchronous version of acquire() that yields to the event loop while waiting."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await self._async_sleep(wait)
+        return wait
+
+# Limiters shared by every Intelisys instance, keyed by (provider, model).
+# A model of None applies to all models of that provider without their own limiter.
+_rate_limiters: Dict[Tuple[str, Optional[str]], RateLimiter] = {}
+
+def set_rate_limit(provider: str, model: Optional[str] = None, requests_per_minute: Optional[float] = None,
+                   tokens_per_minute: Optional[float] = None, **limiter_kwargs) -> Optional[RateLimiter]:
+    """
+    Configure the shared rate limit for a provider, or for one of its models.
+
+    Passing neither requests_per_minute nor tokens_per_minute removes the limit.
+
+    Returns:
+        RateLimiter or None: The limiter now in effect for the key.
+
+    Usage:
+        set_rate_limit("openai", "gpt-4o-mini", requests_per_minute=500, tokens_per_minute=200_000)
+    """
+    key = (provider.lower(), model)
+    if requests_per_minute is None and tokens_per_minute is None:
+        _rate_limiters.pop(key, None)
+        return None
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute, **limiter_kwargs)
+    _rate_limiters[key] = limiter
+    return limiter
+
+def get_rate_limiter(provider: str, model: Optional[str] = None) -> Optional[RateLimiter]:
+    """Return the limiter for (provider, model), falling back to the provider-wide limiter."""
+    return _rate_limiters.get((provider, model)) or _rate_limiters.get((provider, None))
+
+def estimate_request_tokens(params: Dict[str, Any]) -> int:
+    """Roughly estimate the tokens a request consumes: approximate prompt tokens plus max_tokens."""
+    tokens = approximate_token_count(params.get("system") or "")
+    for message in params.get("messages") or []:
+        tokens += approximate_token_count(message.get("content", ""))
+    return tokens + (params.get("max_tokens") or 0)
+
+class BatchResult(NamedTuple):
+    """Outcome of one item of a batch call: either ``result`` or ``error`` is set."""
+    index: int
+    input: Any
+    result: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+class ChatRequest(NamedTuple):
+    """
+    Everything a single chat call sends to the provider, captured when the call starts.
+
+    Requests are built fresh for every call and never modified afterwards (message dicts
+    are copied before provider-specific changes), so one Intelisys instance can serve
+    many concurrent calls from threads or coroutines.
+    """
+    messages: Tuple[Dict[str, Any], ...]
+    system_message: str
+    max_tokens: int
+    stream: bool = False
+    use_history: bool = False
+    image_urls: Tuple[str, ...] = ()
+    params: Tuple[Tuple[str, Any], ...] = ()
+
+def count_words(content: Any) -> int:
+    """Count whitespace-separated words in a message's content."""
+    return len(str(content).split())
+
+def message_text(content: Any) -> str:
+    """Return the text of a message's content, skipping image parts of multi-part content."""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict) and part.get("type") == "text")
+    return str(content)
+
+# Runs of ASCII letters/digits, or any other single non-space character (punctuation, CJK, emoji)
+_TOKEN_PIECE_RE = re.compile(r"[A-Za-z0-9_]+|[^\sA-Za-z0-9_]")
+
+def approximate_token_count(content: Any) -> int:
+    """
+    Fast local token estimate that needs no tokenizer library.
+
+    ASCII words count as one token per five characters (rounded up), and every other
+    non-space character (punctuation, brackets, non-Latin scripts) as one token, which
+    tracks BPE tokenizers far better than word counts for code, JSON and non-English text.
+    """
+    return sum(1 + (len(piece) - 1) // 5 for piece in _TOKEN_PIECE_RE.findall(message_text(content)))
+
+@lru_cache(maxsize=32)
+def _tiktoken_encoding(model: Optional[str]):
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+def get_tokenizer(tokenizer: Union[str, Any, None] = None, provider: Optional[str] = None, model: Optional[str] = None):
+    """
+    Resolve a token counting function for history budgets.
+
+    Args:
+        tokenizer (str or callable, optional): A callable taking message content and returning its
+            token count, "approximate", "tiktoken", or None/"auto" to use tiktoken for OpenAI models
+            when it is installed and approximate_token_count otherwise.
+        provider (str, optional): Provider the tokens are counted for.
+        model (str, optional): Model the tokens are counted for (selects the tiktoken encoding).
+
+    Returns:
+        callable: Function mapping message content to a token count.
+    """
+    if callable(tokenizer):
+        return tokenizer
+    if tokenizer in (None, "auto"):
+        if provider != "openai":
+            return approximate_token_count
+        try:
+            _tiktoken_encoding(model)
+        except ImportError:
+            return approximate_token_count
+        tokenizer = "tiktoken"
+    if tokenizer == "approximate":
+        return approximate_token_count
+    if tokenizer == "tiktoken":
+        try:
+            encoding = _tiktoken_encoding(model)
+        except ImportError:
+            raise ImportError("The 'tiktoken' tokenizer requires the tiktoken package: pip install tiktoken")
+        return lambda content: len(encoding.encode(message_text(content), disallowed_special=()))
+    raise ValueError(f"Unknown tokenizer: {tokenizer!r}. Use 'auto', 'approximate', 'tiktoken' or a callable.")
+
+OUTPUT_TOOL_DESCRIPTION = "Return the response in the required structure."
+
+@lru_cache(maxsize=128)
+def _output_model_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """JSON schema of a Pydantic output model, generated once per class. Treat it as read-only."""
+    return model.model_json_schema()
+
+@lru_cache(maxsize=128)
+def _output_function_spec(model: Type[BaseModel]) -> Dict[str, Any]:
+    """The ``output`` function definition sent for structured output, built once per model class."""
+    return {"name": "output", "parameters": _output_model_schema(model)}
+
+@lru_cache(maxsize=128)
+def _output_tool_spec(model: Type[BaseModel], provider: str) -> Dict[str, Any]:
+    """The ``output`` tool definition for Anthropic or OpenAI-compatible tool calling, built once per model class."""
+    if provider == "anthropic":
+        return {"name": "output", "description": OUTPUT_TOOL_DESCRIPTION, "input_schema": _output_model_schema(model)}
+    return {"type": "function", "function": {"description": OUTPUT_TOOL_DESCRIPTION, **_output_function_spec(model)}}
+
+class MessageHistory(deque):
+    """
+    Conversation history that caches the size of every message.
+
+    Each message's size (words by default) is computed once when it is added, and a running
+    total of non-system messages is kept, so appending and trimming from the front are
+    amortized O(1) instead of re-counting the whole history on every call.
+
+    Args:
+        messages (iterable, optional): Initial messages.
+        counter (callable, optional): Returns the size of a message's content. Defaults to count_words.
+    """
+
+    def __init__(self, messages: Iterable[Dict[str, Any]] = (), counter=None):
+        super().__init__()
+        self._counter = counter or count_words
+        self._sizes = deque()
+        self.total = 0
+        self.extend(messages)
+
+    def _size(self, message: Dict[str, Any]) -> int:
+        return 0 if message.get("role") == "system" else self._counter(message.get("content", ""))
+
+    def _recount(self):
+        self._sizes = deque(self._size(message) for message in self)
+        self.total = sum(self._sizes)
+
+    def append(self, message):
+        size = self._size(message)
+        super().append(message)
+        self._sizes.append(size)
+        self.total += size
+
+    def appendleft(self, message):
+        size = self._size(message)
+        super().appendleft(message)
+        self._sizes.appendleft(size)
+        self.total += size
+
+    def extend(self, messages):
+        for message in messages:
+            self.append(message)
+
+    def extendleft(self, messages):
+        for message in messages:
+            self.appendleft(message)
+
+    def pop(self):
+        message = super().pop()
+        self.total -= self._sizes.pop()
+        return message
+
+    def popleft(self):
+        message = super().popleft()
+        self.total -= self._sizes.popleft()
+        return message
+
+    def clear(self):
+        super().clear()
+        self._sizes.clear()
+        self.total = 0
+
+    # Less common mutations fall back to recounting the whole history
+    def insert(self, index, message):
+        super().insert(index, message)
+        self._recount()
+
+    def remove(self, message):
+        super().remove(message)
+        self._recount()
+
+    def rotate(self, n=1):
+        super().rotate(n)
+        self._sizes.rotate(n)
+
+    def reverse(self):
+        super().reverse()
+        self._sizes.reverse()
+
+    def __setitem__(self, index, message):
+        super().__setitem__(index, message)
+        self._recount()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._recount()
+
+    def __iadd__(self, messages):
+        self.extend(messages)
+        return self
+
+    def __copy__(self):
+        return self.copy()
+
+    # deque's own reduce restores __dict__ and then re-appends every item, counting them twice
+    def __deepcopy__(self, memo):
+        return MessageHistory(copy.deepcopy(list(self), memo), self._counter)
+
+    def __reduce__(self):
+        return self.__class__, (list(self), self._counter)
+
+    def copy(self) -> List[Dict[str, Any]]:
+        """Return the messages as a plain list."""
+        return list(self)
+
+    def trim(self, budget: int) -> int:
+        """Drop the oldest messages until the total fits ``budget`` (always keeping one). Returns the new total."""
+        while self.total > budget and len(self) > 1:
+            self.popleft()
+        return self.total
+
+def make_cache_key(provider: str, params: Dict[str, Any]) -> str:
+    """Canonical SHA-256 key of a provider request, ignoring transport-only parameters."""
+    payload = {k: v for k, v in params.items() if k not in ("stream", "extra_headers")}
+    payload["provider"] = provider
+    canonical = _stdlib_json_dumps(payload, sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Two-tier cache of provider responses: an in-memory LRU in front of an optional SQLite store.
+
+    Entries expire after ``ttl`` seconds in both tiers. The memory tier holds at most
+    ``max_entries`` entries; the SQLite tier evicts least recently used entries once the
+    stored values exceed ``max_disk_bytes``. Values must be JSON-serializable.
+
+    Args:
+        max_entries (int): Maximum number of entries in the memory tier.
+        path (str, optional): SQLite database file for the persistent tier. None keeps the cache in memory only.
+        ttl (float, optional): Seconds an entry stays valid. None means entries never expire.
+        max_disk_bytes (int): Size budget of the SQLite tier.
+
+    Usage:
+        cache = ResponseCache(path="~/.cache/intelisys.sqlite3", ttl=86400)
+        ai = Intelisys(provider="openai", temperature=0, cache=cache)
+    """
+
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None, ttl: Optional[float] = None,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self.stats = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0,
+                      "memory_evictions": 0, "disk_evictions": 0}
+        self._memory: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            import sqlite3
+            path = os.path.expanduser(path)
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires REAL, accessed REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key``, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > now:
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+            if self._db is not None:
+                row = self._db.execute("SELECT value, expires FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value, expires = json_loads(row[0]), row[1]
+                    if expires is None or expires > now:
+                        self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                        self._remember(key, expires, value)
+                        self.stats["hits"] += 1
+                        self.stats["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any):
+        """Store ``value`` under ``key`` in both tiers."""
+        now = time.time()
+        expires = now + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._remember(key, expires, value)
+            if self._db is not None:
+                encoded = json_dumps(value)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, encoded, len(encoded), expires, now))
+                self._evict_disk(now)
+
+    def clear(self):
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+
+    def _remember(self, key: str, expires: Optional[float], value: Any):
+        self._memory[key] = (expires, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["memory_evictions"] += 1
+
+    def _evict_disk(self, now: float):
+        self._db.execute("DELETE FROM responses WHERE expires IS NOT NULL AND expires <= ?", (now,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            if total <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.stats["disk_evictions"] += 1
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls into one.
+
+    The first caller for a key (the leader) makes the call; callers arriving with the same key
+    while it is in flight (followers) wait for and share the leader's result or exception.
+    Async calls run as a task shielded from the cancellation of any single waiter, and are
+    tracked per event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._async_calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = weakref.WeakKeyDictionary()
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def do(self, key: str, func):
+        """Call ``func()`` unless an identical call is in flight. Returns (result, coalesced)."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.stats["calls"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return future.result(), True
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def do_async(self, key: str, coro_func):
+        """Asynchronous version of do(); ``coro_func()`` must return an awaitable."""
+        calls = self._async_calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        coalesced = task is not None
+        with self._lock:
+            self.stats["coalesced" if coalesced else "calls"] += 1
+        if not coalesced:
+            task = calls[key] = asyncio.ensure_future(coro_func())
+            task.add_done_callback(lambda _: calls.pop(key, None))
+        return await asyncio.shield(task), coalesced
+
+# Identical requests are coalesced process-wide, across Intelisys instances
+_single_flight = SingleFlight()
+
+def get_coalescing_stats() -> Dict[str, int]:
+    """Return how many provider calls were made and how many were saved by request coalescing."""
+    with _single_flight._lock:
+        return dict(_single_flight.stats)
+
+_default_response_cache: Optional[ResponseCache] = None
+_default_reference_cache: Optional[ResponseCache] = None
+# LLM-based JSON repairs, keyed by a hash of the malformed input
+_json_repair_cache = ResponseCache(max_entries=256)
+
+def get_default_response_cache() -> ResponseCache:
+    """Return the process-wide in-memory ResponseCache used by instances created with cache=True."""
+    global _default_response_cache
+    with _client_pool_lock:
+        if _default_response_cache is None:
+            _default_response_cache = ResponseCache()
+        return _default_response_cache
+
+def get_default_reference_cache() -> ResponseCache:
+    """Return the process-wide in-memory cache of extracted reference text used with reference_cache=True."""
+    global _default_reference_cache
+    with _client_pool_lock:
+        if _default_reference_cache is None:
+            _default_reference_cache = ResponseCache(max_entries=128)
+        return _default_reference_cache
+
+def reference_cache_key(path: str, by_content: bool = False, **options: Any) -> str:
+    """
+    Cache key of the text extracted from a local file with the given reader options.
+
+    By default the file is identified by its absolute path, size and modification time, so an
+    edited file is re-read. With ``by_content=True`` it is identified by the SHA-256 of its bytes
+    instead, which also matches identical copies at other paths or on other machines.
+    """
+    if by_content:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        identity: Dict[str, Any] = {"sha256": digest.hexdigest()}
+    else:
+        stat = os.stat(path)
+        identity = {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    canonical = _stdlib_json_dumps({"file": identity, "options": options}, sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class StreamSink:
+    """
+    Destination for streamed response text.
+
+    write() is called with each text delta and close() once the stream ends (also on error).
+    Async streams call write_async()/close_async(), which default to the sync methods;
+    sinks that can block should override them so the producer waits for the consumer.
+    """
+
+    def write(self, text: str):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    async def write_async(self, text: str):
+        self.write(text)
+
+    async def close_async(self):
+        self.close()
+
+class TerminalSink(StreamSink):
+    """Print deltas to stdout in color as they arrive (the default for stream=True)."""
+
+    def __init__(self, color: str = "green"):
+        self.color = color
+
+    def write(self, text: str):
+        print(colored(text, self.color), end="", flush=True)
+
+    def close(self):
+        print()
+
+class CallbackSink(StreamSink):
+    """Pass each delta to a callable. Async streams await the result if the callable is a coroutine function."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write(self, text: str):
+        self.callback(text)
+
+    async def write_async(self, text: str):
+        result = self.callback(text)
+        if asyncio.iscoroutine(result):
+            await result
+
+class FileSink(StreamSink):
+    """Write deltas to a file-like object, flushing only when the stream ends unless flush=True."""
+
+    def __init__(self, file, flush: bool = False):
+        self.file = file
+        self.flush = flush
+
+    def write(self, text: str):
+        self.file.write(text)
+        if self.flush:
+            self.file.flush()
+
+    def close(self):
+        if hasattr(self.file, "flush"):
+            self.file.flush()
+
+class QueueSink(StreamSink):
+    """
+    Put deltas on a bounded queue so a slow consumer applies backpressure to the stream.
+
+    Accepts an asyncio.Queue or a queue.Queue. A full queue makes the producer wait. When the
+    stream ends, ``end_marker`` (None by default) is put on the queue. A sync stream feeding an
+    asyncio.Queue from another thread needs the queue's event loop.
+
+    Usage:
+        deltas = asyncio.Queue(maxsize=64)
+        task = asyncio.create_task(consume(deltas))
+        await ai.chat_async("Tell me a story", sink=QueueSink(deltas))
+    """
+
+    def __init__(self, queue_, loop: Optional[asyncio.AbstractEventLoop] = None, end_marker: Any = None):
+        self.queue = queue_
+        self.loop = loop
+        self.end_marker = end_marker
+
+    def _put(self, item):
+        if isinstance(self.queue, asyncio.Queue):
+            if self.loop is None:
+                raise ValueError("QueueSink needs the event loop of its asyncio.Queue to be fed from a sync stream")
+            asyncio.run_coroutine_threadsafe(self.queue.put(item), self.loop).result()
+        else:
+            self.queue.put(item)
+
+    async def _put_async(self, item):
+        if isinstance(self.queue, asyncio.Queue):
+            await self.queue.put(item)
+        else:
+            await asyncio.get_running_loop().run_in_executor(None, self.queue.put, item)
+
+    def write(self, text: str):
+        self._put(text)
+
+    def close(self):
+        self._put(self.end_marker)
+
+    async def write_async(self, text: str):
+        await self._put_async(text)
+
+    async def close_async(self):
+        await self._put_async(self.end_marker)
+
+def _anthropic_delta_text(chunk) -> Optional[str]:
+    # Deltas of a tool_use block (structured output) carry partial_json instead of text
+    return getattr(chunk.delta, "text", None) if chunk.type == 'content_block_delta' else None
+
+def _openai_delta_text(chunk) -> Optional[str]:
+    # OpenAI-compatible streams may end with a usage chunk that has no choices
+    return chunk.choices[0].delta.content if chunk.choices else None
+
+def _anthropic_delta_arguments(chunk) -> Optional[str]:
+    # input_json_delta events of the forced output tool
+    return getattr(chunk.delta, "partial_json", None) if chunk.type == 'content_block_delta' else None
+
+def _openai_delta_arguments(chunk) -> Optional[str]:
+    # The forced output function call (OpenAI) or tool call (Groq, OpenRouter)
+    if not chunk.choices:
+        return None
+    delta = chunk.choices[0].delta
+    function_call = getattr(delta, "function_call", None)
+    if function_call is not None:
+        return function_call.arguments
+    tool_calls = getattr(delta, "tool_calls", None)
+    if tool_calls:
+        return "".join(call.function.arguments or "" for call in tool_calls if call.function is not None)
+    return None
+
+def as_stream_sink(target: Any, color: str = "green") -> Optional[StreamSink]:
+    """
+    Coerce a sink specification into a StreamSink.
+
+    Accepts a StreamSink, "terminal", an asyncio.Queue or queue.Queue, a file-like object with
+    write(), or a callable. None and False disable output.
+    """
+    if target is None or target is False:
+        return None
+    if isinstance(target, StreamSink):
+        return target
+    if target == "terminal":
+        return TerminalSink(color)
+    if isinstance(target, (asyncio.Queue, queue.Queue)):
+        return QueueSink(target)
+    if hasattr(target, "write"):
+        return FileSink(target)
+    if callable(target):
+        return CallbackSink(target)
+    raise TypeError(f"Unsupported stream sink: {target!r}")
+
+# Process-wide registry of provider clients. Instances created with
+# shared_client=True (the default) reuse these, so thousands of short-lived
+# Intelisys objects share warm HTTP connection pools instead of each paying
+# for its own TLS handshakes.
+_client_pool_limits: Dict[str, Optional[float]] = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 30.0,
+}
+_client_pool: Dict[Tuple, Any] = {}
+# Async clients are bound to the event loop their connections were opened on,
+# so they are pooled per loop and dropped together with it.
+_async_client_pool: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, Any]]" = weakref.WeakKeyDictionary()
+_client_pool_lock = threading.Lock()
+
+def configure_client_pool(max_connections: Optional[int] = None,
+                          max_keepalive_connections: Optional[int] = None,
+                          keepalive_expiry: Optional[float] = None) -> None:
+    """
+    Configure HTTP pool limits for shared provider clients.
+
+    Only clients created after this call are affected; call clear_client_pool()
+    first to rebuild existing clients with the new limits.
+
+    Args:
+        max_connections (int, optional): Maximum concurrent connections per client.
+        max_keepalive_connections (int, optional): Maximum idle connections kept alive.
+        keepalive_expiry (float, optional): Seconds an idle connection is kept open.
+    """
+    with _client_pool_lock:
+        if max_connections is not None:
+            _client_pool_limits["max_connections"] = max_connections
+        if max_keepalive_connections is not None:
+            _client_pool_limits["max_keepalive_connections"] = max_keepalive_connections
+        if keepalive_expiry is not None:
+            _client_pool_limits["keepalive_expiry"] = keepalive_expiry
+
+def clear_client_pool() -> None:
+    """Close shared sync clients and the shared HTTP session, and forget every pooled client."""
+    global _http_session
+    with _client_pool_lock:
+        clients = list(_client_pool.values())
+        _client_pool.clear()
+        _async_client_pool.clear()
+        if _http_session is not None:
+            clients.append(_http_session)
+            _http_session = None
+    for client in clients:
+        try:
+            client.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled client: {e}")
+
+def _build_client(provider: str, api_key: str, base_url: Optional[str], use_async: bool):
+    """
+    Create a provider SDK client backed by an httpx pool with the configured limits.
+
+    SDK-level retries are disabled; Intelisys retries requests itself (see max_retry).
+    """
+    import httpx
+    limits = httpx.Limits(**_client_pool_limits)
+    if use_async:
+        http_client = httpx.AsyncClient(limits=limits, follow_redirects=True)
+        if provider == "anthropic":
+            from anthropic import AsyncAnthropic
+            return AsyncAnthropic(api_key=api_key, http_client=http_client, max_retries=0)
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=http_client, max_retries=0)
+    http_client = httpx.Client(limits=limits, follow_redirects=True)
+    if provider == "anthropic":
+        from anthropic import Anthropic
+        return Anthropic(api_key=api_key, http_client=http_client, max_retries=0)
+    from openai import OpenAI
+    return OpenAI(base_url=base_url, api_key=api_key, http_client=http_client, max_retries=0)
+
+class _HTTPCacheEntry(NamedTuple):
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh_until: float
+
+def _http_freshness(headers, now: float) -> Tuple[bool, float]:
+    """Return (storable, fresh_until) for response headers per Cache-Control and Expires."""
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    if "no-store" in directives:
+        return False, 0.0
+    if "no-cache" in directives:
+        return True, 0.0
+    if "max-age" in directives:
+        try:
+            age = float(headers.get("Age", 0))
+            return True, now + float(directives["max-age"]) - age
+        except ValueError:
+            return True, 0.0
+    if "Expires" in headers:
+        from email.utils import parsedate_to_datetime
+        try:
+            return True, parsedate_to_datetime(headers["Expires"]).timestamp()
+        except (TypeError, ValueError):
+            return True, 0.0
+    return True, 0.0
+
+class HTTPCache:
+    """
+    In-memory cache of HTTP GET bodies honouring Cache-Control, Expires, ETag and Last-Modified.
+
+    Fresh entries are served without a request. Stale entries are revalidated with a conditional
+    GET (If-None-Match / If-Modified-Since), and a 304 reply reuses the cached body. Responses
+    marked no-store, and responses with neither a freshness lifetime nor a validator, are not stored.
+
+    Args:
+        max_entries (int): Maximum number of cached URLs.
+        max_bytes (int): Budget for cached bodies; least recently used entries are evicted beyond it.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _HTTPCacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+
+    def get(self, session, url: str, timeout=None) -> bytes:
+        """Return the body of ``url`` fetched with a requests session, from the cache when fresh or still valid."""
+        body, entry, headers = self._lookup(url)
+        if body is not None:
+            return body
+        response = session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and entry is not None:
+            return self._revalidated(url, entry, response.headers)
+        response.raise_for_status()
+        return self._store(url, response.content, response.headers)
+
+    async def get_async(self, session, url: str) -> bytes:
+        """Asynchronous version of get() for an aiohttp ClientSession."""
+        body, entry, headers = self._lookup(url)
+        if body is not None:
+            return body
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and entry is not None:
+                return self._revalidated(url, entry, response.headers)
+            response.raise_for_status()
+            return self._store(url, await response.read(), response.headers)
+
+    def _lookup(self, url: str) -> Tuple[Optional[bytes], Optional[_HTTPCacheEntry], Dict[str, str]]:
+        """Return (fresh body or None, cached entry, conditional request headers)."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+                if entry.fresh_until > time.time():
+                    self.stats["hits"] += 1
+                    return entry.body, entry, {}
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return None, entry, headers
+
+    def _revalidated(self, url: str, entry: _HTTPCacheEntry, headers) -> bytes:
+        _, fresh_until = _http_freshness(headers, time.time())
+        with self._lock:
+            self.stats["revalidated"] += 1
+            if self._entries.get(url) is entry:
+                self._entries[url] = entry._replace(
+                    etag=headers.get("ETag", entry.etag),
+                    last_modified=headers.get("Last-Modified", entry.last_modified),
+                    fresh_until=fresh_until)
+        return entry.body
+
+    def _store(self, url: str, body: bytes, headers) -> bytes:
+        now = time.time()
+        storable, fresh_until = _http_freshness(headers, now)
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        with self._lock:
+            self.stats["misses"] += 1
+            old = self._entries.pop(url, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            if storable and (fresh_until > now or etag or last_modified) and len(body) <= self.max_bytes:
+                self._entries[url] = _HTTPCacheEntry(body, etag, last_modified, fresh_until)
+                self._bytes += len(body)
+                while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= len(evicted.body)
+        return body
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+# Shared requests.Session used for references and images fetched by URL, so repeated
+# fetches reuse pooled connections and the HTTP cache.
+_http_settings: Dict[str, Any] = {"timeout": (10.0, 60.0), "pool_maxsize": 10}
+_http_session = None
+_http_cache: Optional[HTTPCache] = HTTPCache()
+
+def configure_http(timeout: Union[float, Tuple[float, float], None] = None, pool_maxsize: Optional[int] = None,
+                   cache: Union[bool, HTTPCache, None] = None) -> None:
+    """
+    Configure the shared HTTP session used by reference() and image() for URLs.
+
+    Args:
+        timeout (float or (connect, read) tuple, optional): Request timeout in seconds.
+        pool_maxsize (int, optional): Connections kept per host. Applies once the session is rebuilt
+            (see clear_client_pool()).
+        cache (bool or HTTPCache, optional): False disables the HTTP cache, True restores a default
+            one, or pass an HTTPCache with other limits.
+    """
+    global _http_cache
+    with _client_pool_lock:
+        if timeout is not None:
+            _http_settings["timeout"] = timeout
+        if pool_maxsize is not None:
+            _http_settings["pool_maxsize"] = pool_maxsize
+        if cache is not None:
+            _http_cache = (HTTPCache() if cache is True else cache) or None
+
+def _get_http_session():
+    global _http_session
+    with _client_pool_lock:
+        if _http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=_http_settings["pool_maxsize"])
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+        return _http_session
+
+def http_get(url: str) -> bytes:
+    """GET ``url`` with the shared session, timeout and HTTP cache; raises on HTTP errors."""
+    session = _get_http_session()
+    timeout = _http_settings["timeout"]
+    cache = _http_cache
+    if cache is not None:
+        return cache.get(session, url, timeout)
+    response = session.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.content
+
+async def http_get_async(session, url: str) -> bytes:
+    """Asynchronous version of http_get() for an aiohttp ClientSession, sharing the HTTP cache."""
+    cache = _http_cache
+    if cache is not None:
+        return await cache.get_async(session, url)
+    async with session.get(url) as response:
+        response.raise_for_status()
+        return await response.read()
+
+def _aiohttp_timeout():
+    import aiohttp
+    timeout = _http_settings["timeout"]
+    connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+
+def get_shared_client(provider: str, api_key: str, base_url: Optional[str] = None, use_async: bool = False):
+    """
+    Return the process-wide client for (provider, api_key, base_url, use_async), creating it if needed.
+
+    Async clients are pooled per running event loop.
+    """
+    key = (provider, api_key, base_url, use_async)
+    pool = _client_pool
+    with _client_pool_lock:
+        if use_async:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                pool = _async_client_pool.setdefault(loop, {})
+        client = pool.get(key)
+        if client is None:
+            client = _build_client(provider, api_key, base_url, use_async)
+            pool[key] = client
+        return client
+
+class JSONStreamParser:
+    """
+    Incrementally parse a streamed JSON document, emitting top-level items as soon as they are complete.
+
+    For a top-level array each element is emitted once its closing delimiter arrives; for a
+    top-level object each field is emitted as a (key, value) tuple. Text before the first
+    '[' or '{' (prose, markdown fences) and after the closing bracket is ignored. Each chunk
+    of input is scanned once; the unfinished item is kept as a list of chunk pieces and joined
+    only when it completes, so a large item costs time linear in its length.
+
+    Raises:
+        ValueError: From feed() when a completed item is not valid JSON (json.JSONDecodeError).
+
+    Usage:
+        parser = JSONStreamParser()
+        for delta in deltas:
+            for item in parser.feed(delta):
+                process(item)
+    """
+
+    def __init__(self):
+        self.container: Optional[str] = None
+        self.done = False
+        self._parts: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text: str) -> List[Any]:
+        """Add streamed text and return the items completed by it."""
+        items = []
+        if self.done:
+            return items
+        # Start of the unfinished item within this chunk
+        start = 0
+        for i, ch in enumerate(text):
+            if self.container is None:
+                if ch in "[{":
+                    self.container, self._depth, start = ch, 1, i + 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                self._depth += 1
+            elif ch in "]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(text[start:i], items)
+                    self.done = True
+                    return items
+            elif ch == "," and self._depth == 1:
+                self._emit(text[start:i], items)
+                start = i + 1
+        if self.container is not None:
+            self._parts.append(text[start:])
+        return items
+
+    def _emit(self, tail: str, items: List[Any]):
+        raw = "".join(self._parts) + tail if self._parts else tail
+        self._parts = []
+        raw = raw.strip()
+        if not raw:
+            return
+        if self.container == "[":
+            items.append(json_loads(raw))
+        else:
+            items.extend(json_loads("{" + raw + "}").items())
+
+def _spaced(chunks: Iterable[str]) -> Iterator[str]:
+    """Lazily yield ``chunks`` with a single space between them, like ' '.join()."""
+    chunks = iter(chunks)
+    for chunk in chunks:
+        yield chunk
+        break
+    for chunk in chunks:
+        yield ' '
+        yield chunk
+
+# Default word budget of a single reference()
+DEFAULT_REFERENCE_WORDS = 10000
+# Selections at least this long are extracted by a process pool, in shards of PDF_SHARD_PAGES pages
+PDF_PARALLEL_MIN_PAGES = 32
+PDF_SHARD_PAGES = 8
+
+def parse_page_selection(pages: Union[str, int, Iterable[int]], page_count: int) -> List[int]:
+    """
+    Turn a 1-based page selection into 0-based page indices, in the order given.
+
+    Args:
+        pages (str, int or iterable of int): A page number, an iterable of page numbers such as
+            range(1, 11), or a string such as "1-10,15,20-" (an open range runs to the last page).
+        page_count (int): Number of pages in the document.
+
+    Raises:
+        ValueError: If the selection is malformed, has a reversed range or names a page outside the document.
+    """
+    if isinstance(pages, int):
+        numbers: Iterable[int] = [pages]
+    elif isinstance(pages, str):
+        numbers = []
+        for part in pages.replace(" ", "").split(","):
+            if not part:
+                continue
+            first, dash, last = part.partition("-")
+            try:
+                start = int(first) if first else 1
+                end = (int(last) if last else max(start, page_count)) if dash else start
+            except ValueError:
+                raise ValueError(f"Invalid page selection: {part!r}")
+            if end < start:
+                raise ValueError(f"Invalid page selection: {part!r} (the range is reversed)")
+            numbers.extend(range(start, end + 1))
+    else:
+        numbers = pages
+    indices, seen = [], set()
+    for number in numbers:
+        if not 1 <= number <= page_count:
+            raise ValueError(f"Page {number} is out of range; the document has {page_count} pages")
+        if number not in seen:
+            seen.add(number)
+            indices.append(number - 1)
+    return indices
+
+_pdf_worker_reader = None
+
+def _init_pdf_worker(source: Union[str, bytes]):
+    """Process pool initializer: parse the PDF once per worker process."""
+    global _pdf_worker_reader
+    import PyPDF2
+    _pdf_worker_reader = PyPDF2.PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+def _extract_pdf_pages(indices: List[int]) -> List[str]:
+    return [_pdf_worker_reader.pages[i].extract_text() for i in indices]
+
+def _iter_pdf_pages_parallel(source: Union[str, bytes], indices: List[int], workers: int) -> Iterator[str]:
+    """
+    Yield the text of the given PDF pages in order, extracting shards of pages in a process pool.
+
+    At most two shards per worker are in flight, so a consumer that stops early (a word budget)
+    does not pay for the whole document. Unstarted shards are cancelled when the generator is closed.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    shards = iter([indices[i:i + PDF_SHARD_PAGES] for i in range(0, len(indices), PDF_SHARD_PAGES)])
+    # "spawn" on every platform: forking is unsafe when called from a thread (e.g. references_async)
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_pdf_worker, initargs=(source,))
+    pending = deque()
+    try:
+        for shard in shards:
+            pending.append(executor.submit(_extract_pdf_pages, shard))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            texts = pending.popleft().result()
+            shard = next(shards, None)
+            if shard is not None:
+                pending.append(executor.submit(_extract_pdf_pages, shard))
+            yield from texts
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+def _take_words(chunks: Iterable[str], max_words: Optional[int]) -> str:
+    """
+    Concatenate text chunks, stopping as soon as more than ``max_words`` words have been read.
+
+    Returns the text unchanged when it fits the budget, otherwise its first ``max_words`` words
+    followed by "... (truncated)". The chunk iterator is closed early so readers release their files.
+    """
+    chunks = iter(chunks)
+    try:
+        if not max_words:
+            return ''.join(chunks)
+        kept, words = [], []
+        for chunk in chunks:
+            kept.append(chunk)
+            words.extend(chunk.split())
+            if len(words) > max_words:
+                return ' '.join(words[:max_words]) + "... (truncated)"
+        return ''.join(kept)
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
 class Intelisys:
     """
     A class for interacting with various AI providers and models.
@@ -163,6 +1700,13 @@ class Intelisys:
         temperature (float): Temperature for response generation.
         max_tokens (int, optional): Maximum tokens for response.
         log (str or int): Logging level.
+        shared_client (bool): Whether to reuse the process-wide client pool for this provider.
+        max_history_tokens (int): Maximum number of tokens to keep in conversation history.
+        tokenizer (str or callable, optional): Token counter used for max_history_tokens.
+        cache (bool or ResponseCache, optional): Response cache for identical requests.
+        coalesce (bool): Whether concurrent identical requests share one provider call.
+        stream_sink (optional): Destination of streamed text; None disables terminal output.
+        reference_cache (bool or ResponseCache, optional): Cache of text extracted by reference().
 
     Usage:
         intelisys = Intelisys(provider="openai", model="gpt-4")
@@ -179,11 +1723,22 @@ class Intelisys:
         "openrouter": "meta-llama/llama-3.1-405b-instruct",
         "groq": "llama-3.1-8b-instant"
     }
+    RETRY_BASE_DELAY = 0.5
+    RETRY_MAX_DELAY = 30.0
+    # Identify cached references by file content instead of path, size and modification time
+    REFERENCE_CACHE_BY_CONTENT = False
+    BASE_URLS = {
+        "groq": "https://api.groq.com/openai/v1",
+        "openrouter": "https://openrouter.ai/api/v1"
+    }
 
     def __init__(self, name="Intelisys", api_key=None, max_history_words=0,
                  max_words_per_message=None, json_mode=False, stream=False, use_async=False,
                  max_retry=10, provider="anthropic", model=None, should_print_init=False,
-                 print_color="green", temperature=0, max_tokens=None, log: Union[str, int] = "WARNING"):
+                 print_color="green", temperature=0, max_tokens=None, log: Union[str, int] = "WARNING",
+                 shared_client=True, max_history_tokens=0, tokenizer=None,
+                 cache: Union[bool, ResponseCache, None] = None, coalesce=False, stream_sink: Any = "terminal",
+                 reference_cache: Union[bool, ResponseCache, None] = None):
         """
         Initialize the Intelisys instance.
 
@@ -195,7 +1750,9 @@ class Intelisys:
             json_mode (bool): Whether to return responses in JSON format.
             stream (bool): Whether to stream the response.
             use_async (bool): Whether to use async methods.
-            max_retry (int): Maximum number of retries for API calls.
+            max_retry (int): Maximum number of retries for transient API errors (rate limits, overload,
+                server errors, connection failures). Retries use jittered exponential backoff and
+                honour Retry-After headers.
             provider (str): AI provider to use (e.g., "openai", "anthropic").
             model (str, optional): Specific model to use.
             should_print_init (bool): Whether to print initialization details.
@@ -203,6 +1760,20 @@ class Intelisys:
             temperature (float): Temperature for response generation.
             max_tokens (int, optional): Maximum tokens for response.
             log (str or int): Logging level.
+            shared_client (bool): Whether to reuse the process-wide client pool for this provider.
+            max_history_tokens (int): Maximum number of tokens to keep in conversation history.
+                Takes precedence over max_history_words when set.
+            tokenizer (str or callable, optional): Token counter for max_history_tokens: "auto" (default;
+                tiktoken for OpenAI when installed, otherwise a fast local approximation),
+                "approximate", "tiktoken", or a callable returning the token count of a message's content.
+            cache (bool or ResponseCache, optional): Cache non-streamed responses to identical requests.
+                True uses the process-wide in-memory cache; pass a ResponseCache for a SQLite tier or TTL.
+            coalesce (bool): Share one provider call between concurrent identical non-streamed requests.
+            stream_sink (optional): Where streamed text goes when stream=True: "terminal" (default, colored
+                stdout), a StreamSink, a callable, a file-like object, a queue, or None for no output.
+            reference_cache (bool or ResponseCache, optional): Cache the text reference() extracts from
+                local files, keyed by file identity and reader options. True uses the process-wide
+                in-memory cache; pass a ResponseCache with a path for an on-disk store shared by processes.
         """
         
         # Set up logger
@@ -218,8 +1789,14 @@ class Intelisys:
         self.name = name
         self._api_key = api_key
         self.temperature = temperature
-        self.history = []
         self.max_history_words = max_history_words
+        self.max_history_tokens = max_history_tokens
+        if max_history_tokens > 0:
+            self.tokenizer = get_tokenizer(tokenizer, self.provider, model or self.DEFAULT_MODELS.get(self.provider))
+            self.history = MessageHistory(counter=self.tokenizer)
+        else:
+            self.tokenizer = None
+            self.history = MessageHistory()
         self.max_words_per_message = max_words_per_message
         self.json_mode = json_mode
         if self.json_mode and self.provider != "openai":
@@ -227,13 +1804,20 @@ class Intelisys:
         self.stream = stream
         self.use_async = use_async
         self.max_retry = max_retry
+        self.stats = {"requests": 0, "retries": 0, "failed_requests": 0}
+        self._stats_lock = threading.Lock()
         self.print_color = print_color
+        self.stream_sink = as_stream_sink(stream_sink, print_color)
         self.max_tokens = max_tokens
         self.system_message = "You are a helpful assistant."
         if self.provider == "openai" and self.json_mode:
             self.system_message += " Please return your response in JSON"
 
         self._model = model or self.DEFAULT_MODELS.get(self.provider)
+        self.shared_client = shared_client
+        self.cache = get_default_response_cache() if cache is True else (cache or None)
+        self.coalesce = coalesce
+        self.reference_cache = get_default_reference_cache() if reference_cache is True else (reference_cache or None)
         self._client = None
         self.last_response = None
 
@@ -243,7 +1827,8 @@ class Intelisys:
         self.template_persona = ""
         self.template_data = {}
         self.image_urls = []
-        self.current_message = None
+        # Guards history and the queued image_urls, the only state shared between calls
+        self._history_lock = threading.RLock()
         
         if should_print_init:
             print(colored(f"\n{self.name} initialized with provider={self.provider}, model={self.model}, json_mode={self.json_mode}, temp={self.temperature}", "red"))
@@ -287,6 +1872,11 @@ class Intelisys:
     def model(self):
         return self._model or self.DEFAULT_MODELS.get(self.provider)
 
+    @property
+    def history_budget(self) -> int:
+        """The history limit in effect: max_history_tokens if set, else max_history_words (0 disables history)."""
+        return self.max_history_tokens if self.max_history_tokens > 0 else self.max_history_words
+
     @property
     def api_key(self):
         return self._api_key or self._get_api_key()
@@ -335,20 +1925,75 @@ class Intelisys:
 
     def _initialize_client(self):
         self.logger.debug(f"Initializing client for provider: {self.provider}")
-        if self.use_async:
-            if self.provider == "anthropic":
-                self._client = AsyncAnthropic(api_key=self.api_key)
-            else:
-                base_url = "https://api.groq.com/openai/v1" if self.provider == "groq" else "https://openrouter.ai/api/v1" if self.provider == "openrouter" else None
-                self._client = AsyncOpenAI(base_url=base_url, api_key=self.api_key)
+        base_url = self.BASE_URLS.get(self.provider)
+        if self.shared_client:
+            self._client = get_shared_client(self.provider, self.api_key, base_url, self.use_async)
         else:
-            if self.provider == "anthropic":
-                self._client = Anthropic(api_key=self.api_key)
-            else:
-                base_url = "https://api.groq.com/openai/v1" if self.provider == "groq" else "https://openrouter.ai/api/v1" if self.provider == "openrouter" else None
-                self._client = OpenAI(base_url=base_url, api_key=self.api_key)
+            self._client = _build_client(self.provider, self.api_key, base_url, self.use_async)
         self.logger.debug(f"Client initialized: {type(self._client).__name__}")
 
+    def _record_stat(self, name: str, count: int = 1):
+        with self._stats_lock:
+            self.stats[name] = self.stats.get(name, 0) + count
+
+    def _record_rate_limit_wait(self, waited: float):
+        if waited > 0:
+            self._record_stat("rate_limited")
+            with self._stats_lock:
+                self.stats["rate_limit_wait_seconds"] = self.stats.get("rate_limit_wait_seconds", 0.0) + waited
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Return how long to wait before retrying after ``error``, or None if it should be raised."""
+        if attempt >= self.max_retry or not _is_retryable_error(error):
+            self._record_stat("failed_requests")
+            return None
+        delay = _backoff_delay(attempt, self.RETRY_BASE_DELAY, self.RETRY_MAX_DELAY, _retry_after_seconds(error))
+        self._record_stat("retries")
+        self.logger.warning(f"Retryable error ({type(error).__name__}: {error}); retry {attempt + 1}/{self.max_retry} in {delay:.2f}s")
+        return delay
+
+    def _call_with_retry(self, func, *args, **kwargs):
+        """Call a provider API function, retrying transient errors up to max_retry times."""
+        self._record_stat("requests")
+        limiter = get_rate_limiter(self.provider, self.model)
+        tokens = estimate_request_tokens(kwargs) if limiter else 0
+        attempt = 0
+        while True:
+            try:
+                if limiter:
+                    self._record_rate_limit_wait(limiter.acquire(tokens))
+                return func(*args, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def _call_with_retry_async(self, func, *args, **kwargs):
+        """Await a provider API coroutine function, retrying transient errors up to max_retry times."""
+        self._record_stat("requests")
+        limiter = get_rate_limiter(self.provider, self.model)
+        tokens = estimate_request_tokens(kwargs) if limiter else 0
+        attempt = 0
+        while True:
+            try:
+                if limiter:
+                    self._record_rate_limit_wait(await limiter.acquire_async(tokens))
+                return await func(*args, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _compose_system_message(self, message: Optional[str] = None) -> str:
+        system_message = message or "You are a helpful assistant."
+        if self.provider == "openai" and self.json_mode and "json" not in system_message.lower():
+            system_message += " Please return your response in JSON unless user has specified a system message."
+        return system_message
+
     def set_system_message(self, message=None):
         """
         Set the system message for the conversation.
@@ -362,12 +2007,41 @@ class Intelisys:
         Usage:
             intelisys.set_system_message("You are a helpful assistant specialized in Python programming.")
         """
-        self.system_message = message or "You are a helpful assistant."
-        if self.provider == "openai" and self.json_mode and "json" not in message.lower():
-            self.system_message += " Please return your response in JSON unless user has specified a system message."
+        self.system_message = self._compose_system_message(message)
         self.logger.debug(f"System message set: {self.system_message[:50]}...")  # Log first 50 chars
         return self
 
+    def _new_request(self, user_input: Optional[str], *, use_history: bool = True, stream: Optional[bool] = None,
+                     system_message: Optional[str] = None, max_tokens: Optional[int] = None,
+                     include_images: bool = True, **params) -> ChatRequest:
+        """
+        Capture the state of a new chat call in an immutable ChatRequest.
+
+        With history enabled the user message is appended to the history first and the request
+        carries a snapshot of it; otherwise the request carries only the user message. Queued
+        images are handed over to the request. A user_input of None sends the current history as is.
+        """
+        use_history = use_history and self.history_budget > 0
+        with self._history_lock:
+            if use_history:
+                if user_input is not None:
+                    self.add_message("user", user_input)
+                messages = tuple(self.history)
+            else:
+                messages = ({"role": "user", "content": user_input},) if user_input is not None else ()
+            image_urls = ()
+            if include_images:
+                image_urls, self.image_urls = tuple(self.image_urls), []
+        return ChatRequest(
+            messages=messages,
+            system_message=self.system_message if system_message is None else system_message,
+            max_tokens=max_tokens or self.max_tokens or (4000 if self.provider != "anthropic" else 8192),
+            stream=self.stream if stream is None else stream,
+            use_history=use_history,
+            image_urls=image_urls,
+            params=tuple(params.items()),
+        )
+
     def chat(self, user_input):
         """
         Send a chat message to the AI and return the response.
@@ -383,25 +2057,127 @@ class Intelisys:
         """
         self.logger.debug("*Chat*")
         self.logger.debug(f"User input: {user_input[:50]}...")
-        self.current_message = {"role": "user", "content": user_input}
-        if self.max_history_words > 0:
-            self.add_message("user", user_input)
-        
+        request = self._new_request(user_input)
         try:
-            response = self._create_response(self.max_tokens or (4000 if self.provider != "anthropic" else 8192))
-            self.logger.debug(f"Raw API response: {response}")
-            result = self._handle_response(response)
+            result, self.structured_output = self._execute(request, self.stream_sink)
         except Exception as e:
             self.logger.error(f"Error in chat method: {str(e)}")
             raise
-        
-        self.current_message = None
-        self.image_urls = []  # Clear image URLs after sending
-        
         return result
 
+    def chat_stream(self, user_input: str, print_output: bool = False, color: Optional[str] = None,
+                    sink: Any = None) -> Iterator[str]:
+        """
+        Send a chat message and yield the AI's response text as it arrives.
+
+        The request is sent when iteration starts. Once the stream is exhausted the full
+        response is parsed like chat() (JSON mode included), recorded in history and stored
+        in last_response. A stream abandoned early is not recorded in history.
+
+        Args:
+            user_input (str): The user's message to send to the AI.
+            print_output (bool): Also print each delta to stdout (default False).
+            color (str, optional): Color for printed output. Defaults to print_color.
+            sink (optional): Additional destination for each delta (see as_stream_sink()).
+
+        Yields:
+            str: Text deltas in arrival order.
+
+        Usage:
+            for delta in intelisys.chat_stream("Write a haiku about the sea"):
+                send_to_client(delta)
+        """
+        self.logger.debug("*Chat stream*")
+        sink = as_stream_sink(sink, self.print_color) or (TerminalSink(color or self.print_color) if print_output else None)
+        request = self._new_request(user_input, stream=True)
+        response = self._create_response(self._request_params(request))
+        chunks, arguments = [], []
+        for content in self._iter_stream(response, sink, arguments):
+            chunks.append(content)
+            yield content
+        self.last_response, self.structured_output = self._finalize_response(
+            request, *self._stream_result("".join(chunks), arguments))
+
+    def chat_stream_json(self, user_input: str, sink: Any = None) -> Iterator[Any]:
+        """
+        Send a chat message and yield top-level JSON items as soon as they are complete.
+
+        Intended for json_mode responses: elements of a top-level array are yielded as they
+        close, and fields of a top-level object as (key, value) tuples. The complete document is
+        parsed and recorded like chat_stream() once the stream is exhausted.
+
+        Args:
+            user_input (str): The user's message to send to the AI.
+            sink (optional): Destination for the raw text deltas (see as_stream_sink()).
+
+        Yields:
+            Any: Array elements, or (key, value) tuples for an object.
+
+        Usage:
+            for record in intelisys.chat_stream_json("List 100 fictional customers as a JSON array"):
+                save(record)
+        """
+        parser = JSONStreamParser()
+        for delta in self.chat_stream(user_input, sink=sink):
+            yield from parser.feed(delta)
+
+    def _resolve_sink(self, color: Optional[str] = None, should_print: bool = True, sink: Any = None) -> Optional[StreamSink]:
+        """Pick the sink for a call: an explicit sink, else the instance sink (recolored if asked)."""
+        if sink is not None:
+            return as_stream_sink(sink)
+        if not should_print:
+            return None
+        if color and isinstance(self.stream_sink, TerminalSink):
+            return TerminalSink(color)
+        return self.stream_sink
+
+    def _execute(self, request: ChatRequest, sink: Optional[StreamSink] = None):
+        """Send a request and process the response. Returns (assistant_response, structured_output)."""
+        params = self._request_params(request)
+        cache_key = self._response_cache_key(request, params)
+        cached = self._cache_lookup(cache_key)
+        if cached is not None:
+            return self._finalize_response(request, *cached)
+        flight_key = self._flight_key(request, params, cache_key)
+        if flight_key is None:
+            response = self._create_response(params)
+        else:
+            response, coalesced = _single_flight.do(flight_key, lambda: self._create_response(params))
+            if coalesced:
+                self._record_stat("coalesced_requests")
+        self.logger.debug(f"Raw API response: {response}")
+        assistant_response, function_arguments = self._handle_response(request, response, sink)
+        self._cache_store(cache_key, assistant_response, function_arguments)
+        return self._finalize_response(request, assistant_response, function_arguments)
+
+    def _flight_key(self, request: ChatRequest, params: Dict[str, Any], cache_key: Optional[str]) -> Optional[str]:
+        if not self.coalesce or request.stream:
+            return None
+        return cache_key or make_cache_key(self.provider, params)
+
+    def _response_cache_key(self, request: ChatRequest, params: Dict[str, Any]) -> Optional[str]:
+        if self.cache is None or request.stream:
+            return None
+        return make_cache_key(self.provider, params)
+
+    def _cache_lookup(self, cache_key: Optional[str]) -> Optional[Tuple[str, Optional[str]]]:
+        if cache_key is None:
+            return None
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            self._record_stat("cache_misses")
+            return None
+        self._record_stat("cache_hits")
+        self.logger.debug(f"Response cache hit: {cache_key[:12]}")
+        return cached["text"], cached.get("function_arguments")
+
+    def _cache_store(self, cache_key: Optional[str], assistant_response: Optional[str], function_arguments: Optional[str]):
+        if cache_key is not None and assistant_response is not None:
+            self.cache.set(cache_key, {"text": assistant_response, "function_arguments": function_arguments})
+
     def _encode_image(self, image_path: str) -> str:
         self.logger.debug(f"Encoding image: {image_path}")
+        from PIL import Image
         with Image.open(image_path) as img:
             if img.mode != 'RGB':
                 img = img.convert('RGB')
@@ -432,9 +2208,7 @@ class Intelisys:
             raise ValueError("The image method is only supported for the OpenAI and OpenRouter providers.")
         
         if path_or_url.startswith(('http://', 'https://')):
-            response = requests.get(path_or_url)
-            response.raise_for_status()
-            image_data = base64.b64encode(response.content).decode('utf-8')
+            image_data = base64.b64encode(http_get(path_or_url)).decode('utf-8')
         else:
             # Validate local file path
             if not os.path.exists(path_or_url):
@@ -446,82 +2220,103 @@ class Intelisys:
         self.logger.debug(f"Added image: {path_or_url}")
         return self
 
-    def _create_response(self, max_tokens, **kwargs):
-        messages = self.history.copy() if self.max_history_words > 0 else [self.current_message]
-        
+    def _request_params(self, request: ChatRequest) -> Dict[str, Any]:
+        """Build the provider API parameters for a request without touching shared state."""
         common_params = {
             "model": self.model,
-            "messages": messages,
-            "stream": self.stream,
+            "messages": [dict(message) for message in request.messages],
+            "stream": request.stream,
             "temperature": self.temperature,
-            **kwargs
+            **dict(request.params)
         }
 
         if self.provider == "anthropic":
-            return self._create_anthropic_response(common_params, max_tokens)
-        else:
-            return self._create_other_provider_response(common_params, max_tokens)
-
-    def _create_anthropic_response(self, common_params, max_tokens):
-        anthropic_max_tokens = min(max_tokens, 4096)
-        extra_headers = {"anthropic-beta": "max-tokens-3-5-sonnet-2024-07-15"}
-        
-        return self.client.messages.create(
-            system=self.system_message,
-            max_tokens=anthropic_max_tokens,
-            extra_headers=extra_headers,
-            **common_params
-        )
+            common_params["system"] = request.system_message
+            common_params["max_tokens"] = min(request.max_tokens, 4096)
+            common_params["extra_headers"] = {"anthropic-beta": "max-tokens-3-5-sonnet-2024-07-15"}
+            if self.output_model:
+                common_params["tools"] = [_output_tool_spec(self.output_model, "anthropic")]
+                common_params["tool_choice"] = {"type": "tool", "name": "output"}
+            return common_params
 
-    def _create_other_provider_response(self, common_params, max_tokens):
-        if max_tokens:
-            common_params["max_tokens"] = max_tokens
+        if request.max_tokens:
+            common_params["max_tokens"] = request.max_tokens
 
-        if self.image_urls and self.provider in ["openai", "openrouter"]:
-            self._add_image_content(common_params)
+        if request.image_urls and self.provider in ["openai", "openrouter"]:
+            self._add_image_content(common_params, request.image_urls)
 
         if self.json_mode and self.provider == "openai":
             common_params["response_format"] = {"type": "json_object"}
-        
-        if self.system_message:
-            common_params["messages"].insert(0, {"role": "system", "content": self.system_message})
 
-        if self.provider == "openai" and self.output_model:
+        if request.system_message:
+            common_params["messages"].insert(0, {"role": "system", "content": request.system_message})
+
+        if self.output_model:
             self._add_output_model_params(common_params)
 
         self.logger.debug(f"API call params: {common_params}")
-        return self.client.chat.completions.create(**common_params)
+        return common_params
 
-    def _add_image_content(self, common_params):
+    def _create_response(self, params: Dict[str, Any]):
+        if self.provider == "anthropic":
+            return self._call_with_retry(self.client.messages.create, **params)
+        return self._call_with_retry(self.client.chat.completions.create, **params)
+
+    def _add_image_content(self, common_params, image_urls):
         last_message = common_params["messages"][-1]
-        content = [{"type": "text", "text": last_message["content"]}] if isinstance(last_message["content"], str) else []
-        content.extend({"type": "image_url", "image_url": {"url": url}} for url in self.image_urls)
+        content = [{"type": "text", "text": last_message["content"]}] if isinstance(last_message["content"], str) else list(last_message["content"])
+        content.extend({"type": "image_url", "image_url": {"url": url}} for url in image_urls)
         last_message["content"] = content
 
     def _add_output_model_params(self, common_params):
-        common_params["response_format"] = {"type": "json_object"}
-        common_params["functions"] = [{
-            "name": "output",
-            "parameters": self.output_model.model_json_schema()
-        }]
-        common_params["function_call"] = {"name": "output"}
-        
+        if self.provider == "openai":
+            common_params["response_format"] = {"type": "json_object"}
+            common_params["functions"] = [_output_function_spec(self.output_model)]
+            common_params["function_call"] = {"name": "output"}
+        else:
+            common_params["tools"] = [_output_tool_spec(self.output_model, self.provider)]
+            common_params["tool_choice"] = {"type": "function", "function": {"name": "output"}}
+
         json_instruction = "Please return your response in JSON format according to the specified schema."
         if common_params["messages"][0]["role"] == "system":
-            common_params["messages"][0]["content"] += f" {json_instruction}"
+            common_params["messages"][0] = {"role": "system", "content": f"{common_params['messages'][0]['content']} {json_instruction}"}
         else:
             common_params["messages"].insert(0, {"role": "system", "content": json_instruction})
 
-    def _handle_response(self, response):
+    def _handle_response(self, request: ChatRequest, response, sink: Optional[StreamSink] = None):
+        """Read the assistant text and any output-function arguments from a provider response."""
         logger = logging.getLogger("handle_response")
         logger.info("Handling response")
-        if self.stream:
+        if request.stream:
             logger.debug("Handling stream response")
-            assistant_response = self._handle_stream(response, self.print_color, True)
-        else:
-            logger.debug("Handling non-stream response")
-            assistant_response = self._handle_non_stream(response)
-
+            arguments = []
+            return self._stream_result(self._handle_stream(response, sink, arguments), arguments)
+        logger.debug("Handling non-stream response")
+        return self._handle_non_stream(response), self._output_function_arguments(response)
+
+    def _output_function_arguments(self, response) -> Optional[str]:
+        """Return the JSON arguments of the forced ``output`` function/tool call, if any."""
+        if not self.output_model:
+            return None
+        if self.provider == "anthropic":
+            for block in response.content:
+                if block.type == "tool_use" and block.name == "output":
+                    return json_dumps(block.input)
+            return None
+        message = response.choices[0].message
+        if self.provider == "openai":
+            function_call = message.function_call
+            if function_call and function_call.name == "output":
+                return function_call.arguments
+            return None
+        for tool_call in message.tool_calls or ():
+            if tool_call.function.name == "output":
+                return tool_call.function.arguments
+        return None
+
+    def _finalize_response(self, request: ChatRequest, assistant_response, function_arguments: Optional[str] = None):
+        """Parse the assistant text, validate structured output and record the reply in history."""
+        logger = logging.getLogger("handle_response")
         logger.debug(f"Raw assistant response: {assistant_response}")
 
         if assistant_response is None:
@@ -531,74 +2326,123 @@ class Intelisys:
             self.logger.debug("JSON mode is enabled, attempting to parse response")
             if self.provider == "openai":
                 try:
-                    assistant_response = json.loads(assistant_response)
-                except json.JSONDecodeError as json_error:
+                    assistant_response = json_loads(assistant_response)
+                except ValueError as json_error:
                     self.logger.error(f"OpenAI JSON decoding error: {json_error}")
                     raise
-            else:
+            elif not isinstance(assistant_response, (dict, list)):
                 try:
-                    assistant_response = safe_json_loads(assistant_response, error_prefix="Intelisys JSON parsing: ")
+                    assistant_response = safe_json_loads(assistant_response, error_prefix="Intelisys JSON parsing: ",
+                                                         repairer=self)
                 except Exception as json_error:
                     self.logger.error(f"safe_json_loads error: {json_error}")
                     raise
 
-        if self.provider == "openai" and self.output_model:
-            function_call = response.choices[0].message.function_call
-            if function_call and function_call.name == "output":
-                try:
-                    self.structured_output = self.output_model.model_validate_json(function_call.arguments)
-                except ValidationError:
-                    self.logger.warning("Failed to validate structured output")
-                    self.structured_output = None
-            else:
-                self.structured_output = None
+        structured_output = None
+        if self.output_model and function_arguments is not None:
+            from pydantic import ValidationError
+            try:
+                structured_output = self.output_model.model_validate_json(function_arguments)
+            except ValidationError:
+                self.logger.warning("Failed to validate structured output")
 
         self.logger.debug(f"Final processed assistant response: {assistant_response}")
-        self.add_message("assistant", str(assistant_response))
-        self.trim_history()
-        return assistant_response
+        if request.use_history:
+            with self._history_lock:
+                self.add_message("assistant", str(assistant_response))
+        return assistant_response, structured_output
+
+    async def _finalize_response_async(self, request: ChatRequest, assistant_response,
+                                       function_arguments: Optional[str] = None):
+        """Asynchronous version of _finalize_response(): JSON repair is awaited instead of blocking the loop."""
+        if self.json_mode and self.provider != "openai" and isinstance(assistant_response, str):
+            try:
+                assistant_response = await safe_json_loads_async(
+                    assistant_response, error_prefix="Intelisys JSON parsing: ", repairer=self)
+            except Exception as json_error:
+                self.logger.error(f"safe_json_loads error: {json_error}")
+                raise
+        return self._finalize_response(request, assistant_response, function_arguments)
 
-    def _handle_stream(self, response, color, should_print):
+    def _handle_stream(self, response, sink: Optional[StreamSink] = None, arguments: Optional[List[str]] = None):
         self.logger.debug("Handling stream response")
-        assistant_response = ""
-        for chunk in response:
-            content = self._extract_content(chunk)
-            if content:
-                if should_print:
-                    print(colored(content, color), end="", flush=True)
-                assistant_response += content
-        print()
-        return assistant_response
+        return "".join(self._iter_stream(response, sink, arguments))
+
+    def _stream_result(self, text: str, arguments: List[str]) -> Tuple[str, Optional[str]]:
+        """Return (assistant_response, function_arguments) of a finished stream, like _handle_non_stream()."""
+        function_arguments = "".join(arguments) if arguments else None
+        if not text and function_arguments is not None:
+            # A forced output tool call carries the whole answer
+            return function_arguments, function_arguments
+        return text, function_arguments
+
+    def _iter_stream(self, response, sink: Optional[StreamSink] = None,
+                     arguments: Optional[List[str]] = None) -> Iterator[str]:
+        """
+        Yield the text deltas of a provider stream, writing each to ``sink`` first.
+
+        With an output model set, the argument deltas of the forced output tool call are appended
+        to ``arguments`` when a list is given.
+        """
+        # Resolved once per stream: long generations can have tens of thousands of chunks
+        extract = self._content_extractor()
+        extract_arguments = self._arguments_extractor() if arguments is not None and self.output_model else None
+        write = sink.write if sink is not None else None
+        try:
+            for chunk in response:
+                content = extract(chunk)
+                if content:
+                    if write is not None:
+                        write(content)
+                    yield content
+                if extract_arguments is not None:
+                    delta = extract_arguments(chunk)
+                    if delta:
+                        arguments.append(delta)
+        finally:
+            if sink is not None:
+                sink.close()
 
     def _handle_non_stream(self, response):
         self.logger.debug("Handling non-stream response")
         if self.provider == "anthropic":
-            return response.content[0].text
-        elif self.provider == "openai":
+            text = "".join(block.text for block in response.content if block.type == "text")
+        else:
             message = response.choices[0].message
-            if message.function_call:
+            if self.provider == "openai" and message.function_call:
                 return message.function_call.arguments
-            else:
-                return message.content
-        else:
-            return response.choices[0].message.content
+            text = message.content
+        if not text:
+            # A forced output tool call carries the whole answer
+            arguments = self._output_function_arguments(response)
+            if arguments is not None:
+                return arguments
+        return text
 
     def _extract_content(self, chunk):
-        if self.provider == "anthropic":
-            return chunk.delta.text if chunk.type == 'content_block_delta' else None
-        return chunk.choices[0].delta.content if chunk.choices[0].delta.content else None
+        return self._content_extractor()(chunk) or None
+
+    def _content_extractor(self):
+        """Return the function that pulls the text delta out of one of this provider's stream chunks."""
+        return _anthropic_delta_text if self.provider == "anthropic" else _openai_delta_text
+
+    def _arguments_extractor(self):
+        """Return the function that pulls output tool-call argument deltas out of this provider's stream chunks."""
+        return _anthropic_delta_arguments if self.provider == "anthropic" else _openai_delta_arguments
 
     def trim_history(self):
-        if self.max_history_words > 0:
-            self.logger.info("Trimming history")
-            words_count = sum(len(str(m["content"]).split()) for m in self.history if m["role"] != "system")
-            while words_count > self.max_history_words and len(self.history) > 1:
-                removed_message = self.history.pop(0)
-                words_count -= len(str(removed_message["content"]).split())
-            self.logger.debug(f"History trimmed. Current word count: {words_count}")
+        with self._history_lock:
+            return self._trim_history()
+
+    def _trim_history(self):
+        if self.history_budget > 0:
+            self.logger.debug("Trimming history")
+            history_size = self.history.trim(self.history_budget)
+            unit = "token" if self.max_history_tokens > 0 else "word"
+            self.logger.debug(f"History trimmed. Current {unit} count: {history_size}")
         else:
             self.history.clear()
-            self.logger.debug("History cleared (max_history_words is 0)")
+            self.logger.debug("History cleared (max_history_words and max_history_tokens are 0)")
         return self
 
     def add_message(self, role, content):
@@ -610,9 +2454,10 @@ class Intelisys:
             elif isinstance(content, list) and content and isinstance(content[0], dict) and content[0].get('type') == 'text':
                 content[0]['text'] += f" please use {self.max_words_per_message} words or less"
 
-        if self.max_history_words > 0:
-            self.history.append({"role": role, "content": content})
-            self.trim_history()
+        if self.history_budget > 0:
+            with self._history_lock:
+                self.history.append({"role": role, "content": content})
+                self._trim_history()
         return self
 
     def set_default_template(self, template: str) -> 'Intelisys':
@@ -666,6 +2511,15 @@ class Intelisys:
             )
         """
         self.logger.info("*Template*")
+        prompt = self._render_template(render_data, template)
+        system_message = self._compose_system_message(persona or self.default_persona)
+        self.system_message = system_message
+        request = self._new_request(prompt, system_message=system_message)
+        result, self.structured_output = self._execute(request, self.stream_sink)
+        return result
+
+    def _render_template(self, render_data: Optional[Dict[str, Any]] = None, template: Optional[str] = None) -> str:
+        from jinja2 import Template
         try:
             template = Template(template or self.default_template)
             merged_data = {**self.template_data, **(render_data or {})}
@@ -674,9 +2528,130 @@ class Intelisys:
         except Exception as e:
             self.logger.error(f"Error rendering template: {e}")
             raise ValueError(f"Invalid template: {e}")
+        return prompt
+
+    def _json_repair_view(self, use_async: bool) -> 'Intelisys':
+        """
+        A copy of this instance for JSON repair calls: same provider, model and settings, but no
+        history, caching, coalescing or JSON mode (so repair cannot recurse). Built per call so it
+        follows later changes to the instance. It shares this instance's client when the sync/async
+        mode matches, and takes a pooled client of the requested mode otherwise.
+        """
+        if use_async == self.use_async:
+            self.client  # Make sure the view shares this instance's client
+        view = copy.copy(self)
+        if use_async != self.use_async:
+            view.use_async = use_async
+            view.shared_client = True
+            view._client = None
+        view.history = MessageHistory()
+        view.max_history_words = view.max_history_tokens = 0
+        view.json_mode = False
+        view.output_model = None
+        view.cache = None
+        view.coalesce = False
+        view.max_retry = min(self.max_retry, 2)
+        return view
+
+    def _json_repair_request(self, view: 'Intelisys', prompt: str, timeout: Optional[float]) -> ChatRequest:
+        params = {"timeout": timeout} if timeout else {}
+        if self.provider == "openai":
+            params["response_format"] = {"type": "json_object"}
+        return view._new_request(prompt, use_history=False, stream=False, system_message=JSON_REPAIR_SYSTEM_MESSAGE,
+                                 include_images=False, **params)
+
+    def _repair_json_call(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Send a JSON repair prompt with this instance's provider and settings, without history or parsing."""
+        view = self._json_repair_view(use_async=False)
+        result, _ = view._execute(self._json_repair_request(view, prompt, timeout))
+        return result
+
+    async def _repair_json_call_async(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Asynchronous version of _repair_json_call()."""
+        view = self._json_repair_view(use_async=True)
+        result, _ = await view._execute_async(self._json_repair_request(view, prompt, timeout))
+        return result
+
+    def _stateless_chat(self, prompt: str, system_message: Optional[str] = None):
+        """Send one prompt without history, streaming or queued images; return the structured output if any."""
+        request = self._new_request(prompt, use_history=False, stream=False, system_message=system_message,
+                                    include_images=False)
+        result, structured_output = self._execute(request)
+        return structured_output if structured_output is not None else result
+
+    async def _stateless_chat_async(self, prompt: str, system_message: Optional[str] = None):
+        request = self._new_request(prompt, use_history=False, stream=False, system_message=system_message,
+                                    include_images=False)
+        result, structured_output = await self._execute_async(request)
+        return structured_output if structured_output is not None else result
+
+    def _run_batch(self, func, items: Iterable[Any], max_workers: int) -> List[BatchResult]:
+        if self.use_async:
+            raise ValueError("Batch methods require a synchronous instance (use_async=False); use the async API instead.")
+        items = list(items)
+        self.client  # Build the shared client once before fanning out
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{self.name}-batch") as executor:
+            futures = [executor.submit(func, item) for item in items]
+            results = []
+            for index, (item, future) in enumerate(zip(items, futures)):
+                try:
+                    results.append(BatchResult(index, item, future.result()))
+                except Exception as e:
+                    results.append(BatchResult(index, item, error=e))
+        failed = sum(1 for r in results if not r.ok)
+        self.logger.debug(f"Batch finished: {len(results)} items, {failed} failed")
+        return results
+
+    def batch_chat(self, prompts: Iterable[str], max_workers: int = 8) -> List[BatchResult]:
+        """
+        Send many independent prompts concurrently over a thread pool.
+
+        Each prompt is sent without conversation history, using this instance's system
+        message, model settings and client. History and queued images are left untouched.
+
+        Args:
+            prompts (Iterable[str]): The user messages to send.
+            max_workers (int): Maximum number of concurrent requests.
+
+        Returns:
+            List[BatchResult]: One result per prompt, in input order. Failed items carry
+            the exception in ``error`` instead of raising.
+
+        Usage:
+            for item in intelisys.batch_chat(["Capital of France?", "Capital of Peru?"]):
+                print(item.result if item.ok else item.error)
+        """
+        self.logger.debug(f"Batch chat with max_workers={max_workers}")
+        return self._run_batch(self._stateless_chat, prompts, max_workers)
+
+    def batch_template_chat(self,
+                            render_data_list: Iterable[Dict[str, Any]],
+                            template: Optional[str] = None,
+                            persona: Optional[str] = None,
+                            max_workers: int = 8) -> List[BatchResult]:
+        """
+        Render a template for each item of ``render_data_list`` and send the prompts concurrently.
+
+        Args:
+            render_data_list (Iterable[dict]): Render data for each request.
+            template (str, optional): The template string to use. If None, uses the default template.
+            persona (str, optional): The persona to use for the system message. If None, uses the default persona.
+            max_workers (int): Maximum number of concurrent requests.
+
+        Returns:
+            List[BatchResult]: One result per render data item, in input order.
 
-        self.set_system_message(persona or self.default_persona)
-        return self.chat(prompt)
+        Usage:
+            results = intelisys.batch_template_chat(
+                [{"topic": "rust"}, {"topic": "go"}],
+                template="Explain {{topic}} in one sentence."
+            )
+        """
+        self.logger.debug(f"Batch template chat with max_workers={max_workers}")
+        system_message = self._compose_system_message(persona or self.default_persona)
+        return self._run_batch(
+            lambda render_data: self._stateless_chat(self._render_template(render_data, template), system_message),
+            render_data_list, max_workers)
 
     def transcript(self, audio_file_path: str, model: str = "whisper-1") -> str:
         """
@@ -716,14 +2691,26 @@ class Intelisys:
             self.logger.error(f"Error during transcription: {str(e)}")
             raise
 
-    def reference(self, source: str, sheet_name: str = None, sheet_index: int = None) -> 'Intelisys':
+    def reference(self, source: str, sheet_name: str = None, sheet_index: int = None,
+                  max_words: Optional[int] = DEFAULT_REFERENCE_WORDS, pages: Union[str, int, Iterable[int], None] = None,
+                  workers: int = 1) -> 'Intelisys':
         """
         Add content from a URL, file, or various document types to the system message.
 
+        Documents are read page by page (slide, row, paragraph or line), and reading stops as
+        soon as ``max_words`` words have been collected, so large files are not fully extracted.
+
         Args:
             source (str): URL or file path to the reference content.
             sheet_name (str, optional): Name of the sheet to read for Excel files.
             sheet_index (int, optional): Index of the sheet to read for Excel files (0-based).
+            max_words (int, optional): Word budget for the reference; longer content is truncated.
+                None or 0 keeps everything.
+            pages (str, int or iterable of int, optional): 1-based pages to read from a PDF, e.g.
+                "1-10,15" or range(1, 11). Defaults to all pages.
+            workers (int): Processes used to extract large PDF page selections (PDF_PARALLEL_MIN_PAGES
+                pages or more). The default of 1 extracts in this process. Workers are started with
+                the "spawn" method, so scripts passing ``workers`` need an ``if __name__ == "__main__":`` guard.
 
         Returns:
             self: The Intelisys instance for method chaining.
@@ -734,191 +2721,215 @@ class Intelisys:
         self.logger.debug(f"Adding reference from: {source}")
 
         try:
-            if source.startswith(('http://', 'https://')):
-                content = self._fetch_url_content(source)
-            else:
-                file_extension = os.path.splitext(source)[1].lower()
-                if file_extension in ['.xls', '.xlsx']:
-                    content = self._read_excel_content(source, sheet_name, sheet_index)
-                else:
-                    content = self._read_file_content(source)
-
-            # Truncate content if it's too long
-            max_words = 10000  # Adjust this value as needed
-            words = content.split()
-            if len(words) > max_words:
-                content = ' '.join(words[:max_words]) + "... (truncated)"
-
-            # Append the new content to the existing system message
-            self.system_message += f"\n\nReference information:\n{content}"
-            self.logger.debug(f"Updated system message with reference. New word count: {len(content.split())}")
-
+            content = self._load_reference(source, sheet_name, sheet_index, max_words, pages, workers)
+            self._add_reference_content(content)
         except Exception as e:
             self.logger.error(f"Error adding reference: {str(e)}")
             raise ValueError(f"Failed to add reference from {source}: {str(e)}")
 
         return self
 
+    async def reference_async(self, source: str, sheet_name: str = None, sheet_index: int = None,
+                              max_words: Optional[int] = DEFAULT_REFERENCE_WORDS,
+                              pages: Union[str, int, Iterable[int], None] = None,
+                              workers: int = 1) -> 'Intelisys':
+        """
+        Asynchronous version of reference().
+
+        URLs are fetched with aiohttp, and file reading and document parsing run in the default
+        executor, so the event loop is never blocked.
+        """
+        return await self.references_async([source], sheet_name, sheet_index, max_words, pages, workers)
+
+    async def references_async(self, sources: Iterable[str], sheet_name: str = None, sheet_index: int = None,
+                               max_words: Optional[int] = DEFAULT_REFERENCE_WORDS,
+                               pages: Union[str, int, Iterable[int], None] = None,
+                               workers: int = 1, max_concurrency: int = 8) -> 'Intelisys':
+        """
+        Add several references concurrently without blocking the event loop.
+
+        URLs are fetched concurrently with aiohttp through the shared HTTP cache, and file reads and
+        document parsing run in the default executor. The references are appended to the system
+        message in the order of ``sources``; if any of them fails, none is added.
+
+        Args:
+            sources (iterable of str): URLs or file paths.
+            sheet_name, sheet_index, max_words, pages, workers: As for reference(), applied to every source.
+            max_concurrency (int): Maximum number of sources fetched and parsed at once.
+
+        Returns:
+            self: The Intelisys instance for method chaining.
+
+        Raises:
+            ValueError: If any source is invalid or its content cannot be retrieved.
+
+        Usage:
+            await intelisys.references_async(["https://example.com/a.html", "handbook.pdf"])
+        """
+        sources = list(sources)
+        if pages is not None and not isinstance(pages, (str, int)):
+            pages = list(pages)
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def load(source: str, session) -> str:
+            async with semaphore:
+                body = None
+                if source.startswith(('http://', 'https://')):
+                    body = await http_get_async(session, source)
+                return await loop.run_in_executor(None, lambda: self._load_reference(
+                    source, sheet_name, sheet_index, max_words, pages, workers, body))
+
+        session = None
+        if any(source.startswith(('http://', 'https://')) for source in sources):
+            import aiohttp
+            session = aiohttp.ClientSession(timeout=_aiohttp_timeout())
+        try:
+            results = await asyncio.gather(*(load(source, session) for source in sources), return_exceptions=True)
+        finally:
+            if session is not None:
+                await session.close()
+
+        for source, result in zip(sources, results):
+            if isinstance(result, BaseException):
+                self.logger.error(f"Error adding reference: {str(result)}")
+                raise ValueError(f"Failed to add reference from {source}: {str(result)}") from result
+        for content in results:
+            self._add_reference_content(content)
+        return self
+
+    def _add_reference_content(self, content: str):
+        # Append the new content to the existing system message
+        self.system_message += f"\n\nReference information:\n{content}"
+        self.logger.debug(f"Updated system message with reference. New word count: {len(content.split())}")
+
+    def _load_reference(self, source: str, sheet_name: str = None, sheet_index: int = None,
+                        max_words: Optional[int] = DEFAULT_REFERENCE_WORDS,
+                        pages: Union[str, int, Iterable[int], None] = None, workers: Optional[int] = None,
+                        body: Optional[bytes] = None) -> str:
+        """Return the text of a reference, from the reference cache when possible; ``body`` is a prefetched URL body."""
+        file_extension = os.path.splitext(source)[1].lower()
+        if pages is not None and file_extension != '.pdf':
+            raise ValueError("pages= is only supported for PDF references")
+        if pages is not None and not isinstance(pages, (str, int)):
+            pages = list(pages)
+
+        cache_key = content = None
+        if self.reference_cache is not None and not source.startswith(('http://', 'https://')) \
+                and os.path.exists(source):
+            cache_key = reference_cache_key(source, self.REFERENCE_CACHE_BY_CONTENT, sheet_name=sheet_name,
+                                            sheet_index=sheet_index, max_words=max_words, pages=pages)
+            content = self.reference_cache.get(cache_key)
+        if content is None:
+            content = self._extract_reference(source, sheet_name, sheet_index, max_words, pages, workers, body)
+            if cache_key is not None:
+                self.reference_cache.set(cache_key, content)
+        else:
+            self.logger.debug(f"Reference cache hit for {source}")
+        return content
+
+    def _extract_reference(self, source: str, sheet_name: str = None, sheet_index: int = None,
+                           max_words: Optional[int] = DEFAULT_REFERENCE_WORDS,
+                           pages: Union[str, int, List[int], None] = None, workers: Optional[int] = None,
+                           body: Optional[bytes] = None) -> str:
+        """Read a URL or file and return its text, cut to ``max_words`` words."""
+        file_extension = os.path.splitext(source)[1].lower()
+        if source.startswith(('http://', 'https://')):
+            chunks = self._iter_url_text(source, pages, workers, body)
+        elif file_extension in ['.xls', '.xlsx']:
+            chunks = self._iter_excel_text(source, sheet_name, sheet_index)
+        elif file_extension == '.pdf':
+            if not os.path.exists(source):
+                raise FileNotFoundError(f"File not found: {source}")
+            chunks = self._iter_pdf_text(source, pages, workers)
+        else:
+            chunks = self._iter_file_text(source)
+        return _take_words(chunks, max_words)
+
     def _fetch_url_content(self, url: str) -> str:
         """Fetch content from a URL."""
-        response = requests.get(url)
-        response.raise_for_status()
+        return ''.join(self._iter_url_text(url))
+
+    def _iter_url_text(self, url: str, pages: Union[str, int, Iterable[int], None] = None,
+                       workers: Optional[int] = None, body: Optional[bytes] = None) -> Iterator[str]:
+        content = http_get(url) if body is None else body
         if url.lower().endswith('.pdf'):
-            return self._read_pdf_content(io.BytesIO(response.content))
-        soup = BeautifulSoup(response.content, 'html.parser')
+            return self._iter_pdf_text(io.BytesIO(content), pages, workers)
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(content, 'html.parser')
         # Extract text content, ignoring scripts and styles
-        return ' '.join(soup.stripped_strings)
+        return _spaced(soup.stripped_strings)
 
     def _read_file_content(self, filepath: str) -> str:
         """Read content from various file types."""
+        return ''.join(self._iter_file_text(filepath))
+
+    def _iter_file_text(self, filepath: str) -> Iterator[str]:
+        """Yield the text of a file in chunks whose concatenation is what _read_file_content returns."""
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"File not found: {filepath}")
         
         file_extension = os.path.splitext(filepath)[1].lower()
         
         if file_extension == '.pdf':
-            return self._read_pdf_content(filepath)
+            return self._iter_pdf_text(filepath)
         elif file_extension == '.ppt' or file_extension == '.pptx':
-            return self._read_ppt_content(filepath)
+            return self._iter_ppt_text(filepath)
         elif file_extension == '.xls' or file_extension == '.xlsx':
-            return self._read_excel_content(filepath)
+            return self._iter_excel_text(filepath)
         elif file_extension == '.xml':
-            return self._read_xml_content(filepath)
+            return iter([self._read_xml_content(filepath)])
         elif file_extension == '.doc' or file_extension == '.docx':
-            return self._read_doc_content(filepath)
+            return self._iter_doc_text(filepath)
         elif file_extension == '.eml':
-            return self._read_eml_content(filepath)
-        else:
-            # For text files, try different encodings
-            encodings = ['utf-8', 'latin-1', 'ascii']
-            for encoding in encodings:
-                try:
-                    with open(filepath, 'r', encoding=encoding) as file:
-                        return file.read()
-                except UnicodeDecodeError:
-                    continue
-            
-            # If all encodings fail, raise an error
-            raise ValueError(f"Unable to read file {filepath} with any of the attempted encodings")
-
-    def _read_pdf_content(self, filepath: str) -> str:
-        """Read content from a PDF file."""
-        with open(filepath, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            content = []
-            for page in reader.pages:
-                content.append(page.extract_text())
-            return ' '.join(content)
-
-    def _read_ppt_content(self, filepath: str) -> str:
-        """Read content from a PowerPoint file."""
-        prs = Presentation(filepath)
-        content = []
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, 'text'):
-                    content.append(shape.text)
-        return ' '.join(content)
-
-    def _read_excel_content(self, filepath: str, sheet_name: str = None, sheet_index: int = None) -> str:
-        """
-        Read content from an Excel file.
-
-        Args:
-            filepath (str): Path to the Excel file.
-            sheet_name (str, optional): Name of the sheet to read. If None, reads the active sheet.
-            sheet_index (int, optional): Index of the sheet to read (0-based). If provided, overrides sheet_name.
-
-        Returns:
-            str: Content of the specified sheet.
-        """
-        wb = load_workbook(filepath, read_only=True, data_only=True)
-        
-        if sheet_index is not None:
-            if 0 <= sheet_index < len(wb.sheetnames):
-                sheet = wb.worksheets[sheet_index]
-            else:
-                raise ValueError(f"Sheet index {sheet_index} is out of range. The workbook has {len(wb.sheetnames)} sheets.")
-        elif sheet_name:
-            if sheet_name in wb.sheetnames:
-                sheet = wb[sheet_name]
-            else:
-                raise ValueError(f"Sheet '{sheet_name}' not found in the workbook. Available sheets are: {', '.join(wb.sheetnames)}")
+            return iter([self._read_eml_content(filepath)])
         else:
-            sheet = wb.active
-
-        content = []
-        for row in sheet.iter_rows(values_only=True):
-            content.extend(str(cell) for cell in row if cell is not None)
-        
-        return ' '.join(content)
-
-    def _read_xml_content(self, filepath: str) -> str:
-        """Read content from an XML file."""
-        tree = ET.parse(filepath)
-        return ET.tostring(tree.getroot(), encoding='unicode', method='text')
-
-    def _read_doc_content(self, filepath: str) -> str:
-        """Read content from a Word document."""
-        doc = Document(filepath)
-        return ' '.join(paragraph.text for paragraph in doc.paragraphs)
+            return self._iter_text_file(filepath)
 
-    def _read_eml_content(self, filepath: str) -> str:
-        """Read content from an EML file."""
+    def _iter_text_file(self, filepath: str) -> Iterator[str]:
+        # Decode line by line; lines that are not valid UTF-8 fall back to Latin-1, which accepts any byte
         with open(filepath, 'rb') as file:
-            raw_content = file.read()
-        
-        # Detect the encoding
-        detected = chardet.detect(raw_content)
-        encoding = detected['encoding'] or 'utf-8'
-        
-        try:
-            msg = email.message_from_bytes(raw_content)
-            content = []
-            if msg.is_multipart():
-                for part in msg.walk():
-                    if part.get_content_type() == "text/plain":
-                        payload = part.get_payload(decode=True)
-                        try:
-                            decoded = payload.decode(encoding)
-                        except UnicodeDecodeError:
-                            decoded = payload.decode(errors='replace')
-                        content.append(decoded)
-            else:
-                payload = msg.get_payload(decode=True)
+            for line in file:
                 try:
-                    decoded = payload.decode(encoding)
+                    yield line.decode('utf-8')
                 except UnicodeDecodeError:
-                    decoded = payload.decode(errors='replace')
-                content.append(decoded)
-            return ' '.join(content)
-        except Exception as e:
-            self.logger.error(f"Error reading EML file: {str(e)}")
-            return f"Error reading EML file: {str(e)}"
+                    yield line.decode('latin-1')
 
     def _read_pdf_content(self, source: Union[str, io.BytesIO]) -> str:
         """Read content from a PDF file."""
+        return ''.join(self._iter_pdf_text(source))
+
+    def _iter_pdf_text(self, source: Union[str, io.BytesIO], pages: Union[str, int, Iterable[int], None] = None,
+                       workers: Optional[int] = None) -> Iterator[str]:
+        """Yield the text of the selected PDF pages in order; see reference() for ``pages`` and ``workers``."""
+        import PyPDF2
         try:
-            if isinstance(source, str):
-                with open(source, 'rb') as file:
-                    reader = PyPDF2.PdfReader(file)
-                    return ' '.join(page.extract_text() for page in reader.pages)
+            reader = PyPDF2.PdfReader(source)
+            page_count = len(reader.pages)
+            indices = list(range(page_count)) if pages is None else parse_page_selection(pages, page_count)
+            workers = min(workers or 1, -(-len(indices) // PDF_SHARD_PAGES))
+            if workers > 1 and len(indices) >= PDF_PARALLEL_MIN_PAGES:
+                data = source if isinstance(source, str) else source.getvalue()
+                texts = _iter_pdf_pages_parallel(data, indices, workers)
             else:
-                reader = PyPDF2.PdfReader(source)
-                return ' '.join(page.extract_text() for page in reader.pages)
+                texts = (reader.pages[i].extract_text() for i in indices)
+            try:
+                yield from _spaced(texts)
+            finally:
+                # Stop the pool as soon as the consumer has enough text
+                texts.close()
         except Exception as e:
             self.logger.error(f"Error reading PDF: {str(e)}")
             raise ValueError(f"Failed to read PDF: {str(e)}")
 
     def _read_ppt_content(self, filepath: str) -> str:
         """Read content from a PowerPoint file."""
+        return ''.join(self._iter_ppt_text(filepath))
+
+    def _iter_ppt_text(self, filepath: str) -> Iterator[str]:
+        from pptx import Presentation
         prs = Presentation(filepath)
-        content = []
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, 'text'):
-                    content.append(shape.text)
-        return ' '.join(content)
+        return _spaced(shape.text for slide in prs.slides for shape in slide.shapes if hasattr(shape, 'text'))
 
     def _read_excel_content(self, filepath: str, sheet_name: str = None, sheet_index: int = None) -> str:
         """
@@ -932,39 +2943,51 @@ class Intelisys:
         Returns:
             str: Content of the specified sheet.
         """
+        return ''.join(self._iter_excel_text(filepath, sheet_name, sheet_index))
+
+    def _iter_excel_text(self, filepath: str, sheet_name: str = None, sheet_index: int = None) -> Iterator[str]:
+        """Yield the cells of an Excel sheet row by row; see _read_excel_content."""
+        from openpyxl import load_workbook
         wb = load_workbook(filepath, read_only=True, data_only=True)
-        
-        if sheet_index is not None:
-            if 0 <= sheet_index < len(wb.sheetnames):
-                sheet = wb.worksheets[sheet_index]
-            else:
-                raise ValueError(f"Sheet index {sheet_index} is out of range. The workbook has {len(wb.sheetnames)} sheets.")
-        elif sheet_name:
-            if sheet_name in wb.sheetnames:
-                sheet = wb[sheet_name]
+        try:
+            if sheet_index is not None:
+                if 0 <= sheet_index < len(wb.sheetnames):
+                    sheet = wb.worksheets[sheet_index]
+                else:
+                    raise ValueError(f"Sheet index {sheet_index} is out of range. The workbook has {len(wb.sheetnames)} sheets.")
+            elif sheet_name:
+                if sheet_name in wb.sheetnames:
+                    sheet = wb[sheet_name]
+                else:
+                    raise ValueError(f"Sheet '{sheet_name}' not found in the workbook. Available sheets are: {', '.join(wb.sheetnames)}")
             else:
-                raise ValueError(f"Sheet '{sheet_name}' not found in the workbook. Available sheets are: {', '.join(wb.sheetnames)}")
-        else:
-            sheet = wb.active
+                sheet = wb.active
 
-        content = []
-        for row in sheet.iter_rows(values_only=True):
-            content.extend(str(cell) for cell in row if cell is not None)
-        
-        return ' '.join(content)
+            rows = (' '.join(str(cell) for cell in row if cell is not None) for row in sheet.iter_rows(values_only=True))
+            yield from _spaced(row for row in rows if row)
+        finally:
+            # Read-only workbooks keep the file open until closed
+            wb.close()
 
     def _read_xml_content(self, filepath: str) -> str:
         """Read content from an XML file."""
+        import xml.etree.ElementTree as ET
         tree = ET.parse(filepath)
         return ET.tostring(tree.getroot(), encoding='unicode', method='text')
 
     def _read_doc_content(self, filepath: str) -> str:
         """Read content from a Word document."""
+        return ''.join(self._iter_doc_text(filepath))
+
+    def _iter_doc_text(self, filepath: str) -> Iterator[str]:
+        from docx import Document
         doc = Document(filepath)
-        return ' '.join(paragraph.text for paragraph in doc.paragraphs)
+        return _spaced(paragraph.text for paragraph in doc.paragraphs)
 
     def _read_eml_content(self, filepath: str) -> str:
         """Read content from an EML file."""
+        import email
+        import chardet
         with open(filepath, 'rb') as file:
             raw_content = file.read()
         
@@ -1011,12 +3034,116 @@ class Intelisys:
             self.logger.debug("Exiting template context")
 
     # Async methods
-    async def chat_async(self, user_input, **kwargs):
+    async def chat_async(self, user_input, color=None, should_print=True, sink=None, **kwargs):
         self.logger.debug("Async chat method called")
-        await self.add_message_async("user", user_input)
-        self.last_response = await self.get_response_async(**kwargs)
+        request = self._new_request(user_input, **kwargs)
+        self.last_response, self.structured_output = await self._execute_async(
+            request, self._resolve_sink(color, should_print, sink))
         return self.last_response
 
+    async def chat_stream_async(self, user_input: str, print_output: bool = False,
+                                color: Optional[str] = None, sink: Any = None) -> AsyncIterator[str]:
+        """
+        Asynchronously send a chat message and yield the AI's response text as it arrives.
+
+        Asynchronous version of chat_stream(); requires use_async=True.
+
+        Usage:
+            async for delta in intelisys.chat_stream_async("Write a haiku about the sea"):
+                await websocket.send(delta)
+        """
+        self.logger.debug("Async chat stream method called")
+        sink = as_stream_sink(sink, self.print_color) or (TerminalSink(color or self.print_color) if print_output else None)
+        request = self._new_request(user_input, stream=True)
+        response = await self._create_response_async(self._request_params(request))
+        chunks, arguments = [], []
+        async for content in self._iter_stream_async(response, sink, arguments):
+            chunks.append(content)
+            yield content
+        self.last_response, self.structured_output = await self._finalize_response_async(
+            request, *self._stream_result("".join(chunks), arguments))
+
+    async def chat_stream_json_async(self, user_input: str, sink: Any = None) -> AsyncIterator[Any]:
+        """
+        Asynchronously send a chat message and yield top-level JSON items as soon as they are complete.
+
+        Asynchronous version of chat_stream_json(); requires use_async=True.
+        """
+        parser = JSONStreamParser()
+        async for delta in self.chat_stream_async(user_input, sink=sink):
+            for item in parser.feed(delta):
+                yield item
+
+    async def iter_chat_async(self, prompts: Iterable[str], max_concurrency: int = 8,
+                              timeout: Optional[float] = None, fail_fast: bool = False) -> AsyncIterator[BatchResult]:
+        """
+        Send many independent prompts concurrently and yield results as they complete.
+
+        Each prompt is sent without conversation history, using this instance's system
+        message, model settings and client. History and queued images are left untouched.
+
+        Args:
+            prompts (Iterable[str]): The user messages to send.
+            max_concurrency (int): Maximum number of requests in flight at once.
+            timeout (float, optional): Per-request timeout in seconds; a timed-out item
+                carries an asyncio.TimeoutError.
+            fail_fast (bool): Stop after the first failed item and cancel the pending ones.
+
+        Yields:
+            BatchResult: Per-item results in completion order; ``index`` gives the input position.
+
+        Usage:
+            async for item in intelisys.iter_chat_async(prompts, max_concurrency=16):
+                print(item.index, item.result)
+        """
+        if not self.use_async:
+            raise ValueError("Async batch methods require an asynchronous instance (use_async=True).")
+        prompts = list(prompts)
+        self.logger.debug(f"Async batch chat of {len(prompts)} prompts with max_concurrency={max_concurrency}")
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(index, prompt):
+            async with semaphore:
+                try:
+                    response = await asyncio.wait_for(self._stateless_chat_async(prompt), timeout)
+                    return BatchResult(index, prompt, response)
+                except Exception as e:
+                    return BatchResult(index, prompt, error=e)
+
+        tasks = [asyncio.ensure_future(run(index, prompt)) for index, prompt in enumerate(prompts)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                yield result
+                if fail_fast and not result.ok:
+                    self.logger.debug(f"Cancelling pending requests after failure of item {result.index}")
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def gather_chat_async(self, prompts: Iterable[str], max_concurrency: int = 8,
+                                timeout: Optional[float] = None, fail_fast: bool = False) -> List[BatchResult]:
+        """
+        Send many independent prompts concurrently and return all results in input order.
+
+        Takes the same arguments as iter_chat_async(). With fail_fast=True, items that were
+        cancelled after the first failure carry an asyncio.CancelledError.
+
+        Returns:
+            List[BatchResult]: One result per prompt, in input order.
+
+        Usage:
+            results = await intelisys.gather_chat_async(prompts, max_concurrency=16, timeout=60)
+        """
+        prompts = list(prompts)
+        results: List[Optional[BatchResult]] = [None] * len(prompts)
+        async for result in self.iter_chat_async(prompts, max_concurrency, timeout, fail_fast):
+            results[result.index] = result
+        return [result or BatchResult(index, prompts[index], error=asyncio.CancelledError())
+                for index, result in enumerate(results)]
+
     async def add_message_async(self, role, content):
         self.logger.debug(f"Async adding message with role: {role}")
         self.add_message(role, content)
@@ -1027,81 +3154,71 @@ class Intelisys:
         self.set_system_message(message)
         return self
 
-    async def get_response_async(self, color=None, should_print=True, **kwargs):
+    async def get_response_async(self, color=None, should_print=True, sink=None, **kwargs):
         self.logger.debug("Async get_response method called")
-        color = color or self.print_color
-        max_tokens = kwargs.pop('max_tokens', 4000 if self.provider != "anthropic" else 8192)
-
-        response = await self._create_response_async(max_tokens, **kwargs)
-
-        assistant_response = await self._handle_stream_async(response, color, should_print) if self.stream else await self._handle_non_stream_async(response)
-
-        if self.json_mode and self.provider == "openai":
-            try:
-                assistant_response = json.loads(assistant_response)
-            except json.JSONDecodeError as json_error:
-                self.logger.error(f"JSON decoding error: {json_error}")
-                raise
-
-        await self.add_message_async("assistant", str(assistant_response))
-        await self.trim_history_async()
+        request = self._new_request(None, **kwargs)
+        assistant_response, self.structured_output = await self._execute_async(
+            request, self._resolve_sink(color, should_print, sink))
         return assistant_response
 
-    async def _create_response_async(self, max_tokens, **kwargs):
-        self.logger.debug(f"Creating async response with max_tokens={max_tokens}")
-        if self.provider == "anthropic":
-            return await self.client.messages.create(
-                model=self.model,
-                system=self.system_message,
-                messages=self.history,
-                stream=self.stream,
-                temperature=self.temperature,
-                max_tokens=max_tokens,
-                extra_headers={"anthropic-beta": "max-tokens-3-5-sonnet-2024-07-15"},
-                **kwargs
-            )
+    async def _execute_async(self, request: ChatRequest, sink: Optional[StreamSink] = None):
+        """Asynchronous version of _execute()."""
+        params = self._request_params(request)
+        cache_key = self._response_cache_key(request, params)
+        cached = self._cache_lookup(cache_key)
+        if cached is not None:
+            return await self._finalize_response_async(request, *cached)
+        flight_key = self._flight_key(request, params, cache_key)
+        if flight_key is None:
+            response = await self._create_response_async(params)
         else:
-            common_params = {
-                "model": self.model,
-                "messages": [{"role": "system", "content": self.system_message}] + self.history,
-                "stream": self.stream,
-                "temperature": self.temperature,
-                "max_tokens": max_tokens,
-                **kwargs
-            }
-            if self.json_mode and self.provider == "openai":
-                common_params["response_format"] = {"type": "json_object"}
-            
-            if self.provider == "openai" and self.output_model:
-                common_params["response_format"] = {"type": "json_object"}
-                common_params["functions"] = [{
-                    "name": "output",
-                    "parameters": self.output_model.model_json_schema()
-                }]
-                common_params["function_call"] = {"name": "output"}
+            response, coalesced = await _single_flight.do_async(flight_key, lambda: self._create_response_async(params))
+            if coalesced:
+                self._record_stat("coalesced_requests")
+        if request.stream:
+            arguments = []
+            assistant_response, function_arguments = self._stream_result(
+                await self._handle_stream_async(response, sink, arguments), arguments)
+        else:
+            assistant_response = self._handle_non_stream(response)
+            function_arguments = self._output_function_arguments(response)
+        self._cache_store(cache_key, assistant_response, function_arguments)
+        return await self._finalize_response_async(request, assistant_response, function_arguments)
 
-            return await self.client.chat.completions.create(**common_params)
+    async def _create_response_async(self, params: Dict[str, Any]):
+        self.logger.debug(f"Creating async response with max_tokens={params.get('max_tokens')}")
+        if self.provider == "anthropic":
+            return await self._call_with_retry_async(self.client.messages.create, **params)
+        return await self._call_with_retry_async(self.client.chat.completions.create, **params)
 
-    async def _handle_stream_async(self, response, color, should_print):
+    async def _handle_stream_async(self, response, sink: Optional[StreamSink] = None,
+                                   arguments: Optional[List[str]] = None):
         self.logger.debug("Handling async stream response")
-        assistant_response = ""
-        async for chunk in response:
-            content = self._extract_content_async(chunk)
-            if content:
-                if should_print:
-                    print(colored(content, color), end="", flush=True)
-                assistant_response += content
-        print()
-        return assistant_response
-
-    async def _handle_non_stream_async(self, response):
-        self.logger.debug("Handling async non-stream response")
-        return response.content[0].text if self.provider == "anthropic" else response.choices[0].message.content
+        return "".join([content async for content in self._iter_stream_async(response, sink, arguments)])
+
+    async def _iter_stream_async(self, response, sink: Optional[StreamSink] = None,
+                                 arguments: Optional[List[str]] = None) -> AsyncIterator[str]:
+        """Yield the text deltas of an async provider stream, awaiting ``sink`` for each one first; see _iter_stream()."""
+        extract = self._content_extractor()
+        extract_arguments = self._arguments_extractor() if arguments is not None and self.output_model else None
+        write_async = sink.write_async if sink is not None else None
+        try:
+            async for chunk in response:
+                content = extract(chunk)
+                if content:
+                    if write_async is not None:
+                        await write_async(content)
+                    yield content
+                if extract_arguments is not None:
+                    delta = extract_arguments(chunk)
+                    if delta:
+                        arguments.append(delta)
+        finally:
+            if sink is not None:
+                await sink.close_async()
 
     def _extract_content_async(self, chunk):
-        if self.provider == "anthropic":
-            return chunk.delta.text if chunk.type == 'content_block_delta' else None
-        return chunk.choices[0].delta.content if chunk.choices[0].delta.content else None
+        return self._extract_content(chunk)
 
     async def trim_history_async(self):
         self.logger.debug("Async trimming history")
@@ -1110,7 +3227,10 @@ class Intelisys:
 
     def set_output_model(self, model: Type[BaseModel]):
         """
-        Set the Pydantic model for structured output (OpenAI provider only).
+        Set the Pydantic model for structured output.
+
+        OpenAI uses a forced function call, Anthropic a forced tool use, and Groq and OpenRouter
+        OpenAI-compatible forced tool calls, so the reply arrives as arguments matching the schema.
 
         Args:
             model (Type[BaseModel]): The Pydantic model defining the structure of the output.
@@ -1118,10 +3238,7 @@ class Intelisys:
         Returns:
             self: The Intelisys instance for method chaining.
         """
-        if self.provider != "openai":
-            self.logger.warning("Structured output is only supported for the OpenAI provider. This setting will be ignored.")
-        else:
-            self.output_model = model
+        self.output_model = model
         return self
 
     def results(self) -> Union[str, BaseModel, None]:
@@ -1130,10 +3247,10 @@ class Intelisys:
 
         Returns:
             Union[str, BaseModel, None]: The chat response as a string, 
-            a Pydantic model instance (if structured output is used with OpenAI), 
+            a Pydantic model instance (if structured output is used), 
             or None if not available.
         """
-        if self.provider == "openai" and self.structured_output:
+        if self.structured_output:
             return self.structured_output
         return self.last_response
 
@@ -1165,30 +3282,16 @@ class Intelisys:
             result = intelisys.last_response
         """
         self.logger.debug("Async template chat method called")
-        try:
-            template = Template(template or self.default_template)
-            merged_data = {**self.template_data, **(render_data or {})}
-            prompt = template.render(**merged_data)
-            self.logger.debug(f"Rendered prompt: {prompt[:50]}...")  # Log first 50 chars
-        except Exception as e:
-            self.logger.error(f"Error rendering template: {e}")
-            raise ValueError(f"Invalid template: {e}")
+        prompt = self._render_template(render_data, template)
+        system_message = self._compose_system_message(persona or self.default_persona)
+        self.system_message = system_message
+        request = self._new_request(prompt, system_message=system_message)
+        response, self.structured_output = await self._execute_async(request, self.stream_sink)
+
+        # In JSON mode the reply has already been parsed (and repaired) by _finalize_response_async()
+        if self.json_mode and not isinstance(response, (dict, list)):
+            self.logger.error(f"Unexpected response type: {type(response)}")
+            raise ValueError(f"Unexpected response type: {type(response)}")
+        self.last_response = response
 
-        await self.set_system_message_async(persona or self.default_persona)
-        response = await self.chat_async(prompt)
-        
-        if self.json_mode:
-            if isinstance(response, dict):
-                self.last_response = response
-            elif isinstance(response, str):
-                try:
-                    self.last_response = json.loads(response)
-                except json.JSONDecodeError:
-                    self.last_response = safe_json_loads(response, error_prefix="Intelisys async template chat JSON parsing: ")
-            else:
-                self.logger.error(f"Unexpected response type: {type(response)}")
-                raise ValueError(f"Unexpected response type: {type(response)}")
-        else:
-            self.last_response = response
-        
         return self
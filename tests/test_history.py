@@ -0,0 +1,74 @@
+import copy
+import pickle
+import time
+
+from intelisys import Intelisys
+from intelisys.intelisys import MessageHistory, count_words
+
+
+def naive_trim(history, budget):
+    """The trimming algorithm MessageHistory replaced: re-count everything after every pop."""
+    history = list(history)
+    while sum(count_words(m["content"]) for m in history if m["role"] != "system") > budget and len(history) > 1:
+        history.pop(0)
+    return history
+
+
+def conversation(n):
+    return [{"role": "user" if i % 2 else "assistant", "content": "word " * (i % 37 + 1)} for i in range(n)]
+
+
+def test_running_total_matches_recount():
+    history = MessageHistory([{"role": "system", "content": "ignored words here"}])
+    history.extend(conversation(50))
+    history.popleft()
+    history.pop()
+    history.insert(3, {"role": "user", "content": "one two three"})
+    del history[5]
+    history[0] = {"role": "assistant", "content": "replaced"}
+    history.rotate(7)
+    history.appendleft({"role": "user", "content": "first"})
+    assert history.total == sum(count_words(m["content"]) for m in history if m["role"] != "system")
+    assert isinstance(history.copy(), list)
+
+
+def test_trim_matches_naive_trim():
+    messages = conversation(500)
+    history = MessageHistory()
+    expected = []
+    for message in messages:
+        history.append(message)
+        history.trim(300)
+        expected = naive_trim(expected + [message], 300)
+        assert list(history) == expected
+
+
+def test_trim_keeps_the_last_message():
+    history = MessageHistory([{"role": "user", "content": "word " * 100}])
+    assert history.trim(10) == 100
+    assert len(history) == 1
+
+
+def test_add_message_scales_linearly():
+    ai = Intelisys(provider="openai", api_key="test-key", max_history_words=50_000)
+    messages = conversation(10_000)
+    start = time.perf_counter()
+    for message in messages:
+        ai.add_message(message["role"], message["content"])
+    elapsed = time.perf_counter() - start
+    assert ai.history.total <= 50_000
+    assert list(ai.history) == naive_trim(messages[-len(ai.history) - 1:], 50_000)
+    # About 0.05 s here; re-counting the history on every message took about a minute
+    assert elapsed < 2.0
+
+
+def test_deepcopy_and_pickle_keep_counts():
+    history = MessageHistory([{"role": "system", "content": "be brief"}, {"role": "user", "content": "a b c"}])
+    for clone in (copy.deepcopy(history), pickle.loads(pickle.dumps(history))):
+        assert isinstance(clone, MessageHistory)
+        assert list(clone) == list(history)
+        assert clone.total == 3
+        assert len(clone._sizes) == len(clone)
+        clone.append({"role": "assistant", "content": "d e"})
+        assert clone.trim(2) == 2
+        assert len(history) == 2
@@ -0,0 +1,150 @@
+import asyncio
+import http.server
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("requests")
+
+import intelisys.intelisys as intelisys_module
+from intelisys import HTTPCache, configure_http
+from intelisys.intelisys import http_get, http_get_async
+
+BODY = b"<html><body><p>Hello</p></body></html>"
+LAST_MODIFIED = "Wed, 21 Oct 2015 07:28:00 GMT"
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = Counter()
+    not_modified = Counter()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requests[self.path] += 1
+        if self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                return self._not_modified()
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Cache-Control", "no-cache")
+        elif self.path == "/last-modified":
+            if self.headers.get("If-Modified-Since") == LAST_MODIFIED:
+                return self._not_modified()
+            self.send_response(200)
+            self.send_header("Last-Modified", LAST_MODIFIED)
+        elif self.path == "/max-age":
+            self.send_response(200)
+            self.send_header("Cache-Control", "max-age=1")
+        elif self.path == "/no-store":
+            self.send_response(200)
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("ETag", '"v1"')
+        elif self.path == "/slow":
+            time.sleep(1)
+            self.send_response(200)
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def _not_modified(self):
+        self.not_modified[self.path] += 1
+        self.send_response(304)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def cache():
+    saved_cache, saved_timeout = intelisys_module._http_cache, intelisys_module._http_settings["timeout"]
+    cache = HTTPCache()
+    configure_http(cache=cache)
+    Handler.requests.clear()
+    Handler.not_modified.clear()
+    yield cache
+    configure_http(timeout=saved_timeout, cache=saved_cache or False)
+
+
+def fetch(base, path, times=3):
+    return [http_get(base + path) for _ in range(times)]
+
+
+def test_etag_is_revalidated(server, cache):
+    assert fetch(server, "/etag") == [BODY] * 3
+    assert Handler.requests["/etag"] == 3
+    assert Handler.not_modified["/etag"] == 2
+    assert cache.stats == {"hits": 0, "revalidated": 2, "misses": 1}
+
+
+def test_last_modified_is_revalidated(server, cache):
+    assert fetch(server, "/last-modified") == [BODY] * 3
+    assert Handler.not_modified["/last-modified"] == 2
+
+
+def test_max_age_serves_fresh_entries_without_a_request(server, cache):
+    assert fetch(server, "/max-age") == [BODY] * 3
+    assert Handler.requests["/max-age"] == 1
+    assert cache.stats["hits"] == 2
+    time.sleep(1.1)
+    assert http_get(server + "/max-age") == BODY
+    assert Handler.requests["/max-age"] == 2
+
+
+def test_no_store_is_never_cached(server, cache):
+    assert fetch(server, "/no-store") == [BODY] * 3
+    assert Handler.requests["/no-store"] == 3
+    assert Handler.not_modified["/no-store"] == 0
+    assert cache.stats == {"hits": 0, "revalidated": 0, "misses": 3}
+
+
+def test_disabled_cache_always_fetches(server, cache):
+    configure_http(cache=False)
+    assert fetch(server, "/max-age") == [BODY] * 3
+    assert Handler.requests["/max-age"] == 3
+
+
+def test_http_errors_raise(server, cache):
+    import requests
+    with pytest.raises(requests.HTTPError):
+        http_get(server + "/missing")
+
+
+def test_timeout(server, cache):
+    import requests
+    configure_http(timeout=0.2)
+    start = time.perf_counter()
+    with pytest.raises(requests.Timeout):
+        http_get(server + "/slow")
+    assert time.perf_counter() - start < 0.9
+
+
+def test_async_fetches_share_the_cache(server, cache):
+    aiohttp = pytest.importorskip("aiohttp")
+
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            return [await http_get_async(session, server + "/max-age") for _ in range(2)]
+
+    assert asyncio.run(run()) == [BODY] * 2
+    assert http_get(server + "/max-age") == BODY
+    assert Handler.requests["/max-age"] == 1
+    assert cache.stats["hits"] == 2
@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported on first use only; ``import intelisys`` must not pull any of them in
+HEAVY_MODULES = [
+    "openai", "anthropic", "httpx", "PyPDF2", "pptx", "openpyxl", "docx", "bs4", "PIL",
+    "requests", "aiohttp", "pydantic", "jinja2", "tiktoken",
+]
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import intelisys
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "loaded": sorted(set(sys.argv[1:]) & set(sys.modules))}))
+"""
+
+
+def run_import():
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.run([sys.executable, "-c", SCRIPT, *HEAVY_MODULES], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_import_does_not_load_heavy_dependencies():
+    assert run_import()["loaded"] == []
+
+
+def test_import_time_budget():
+    # Generous bound: the import is a few tens of milliseconds without the SDKs and parsers
+    assert min(run_import()["elapsed"] for _ in range(3)) < 0.5
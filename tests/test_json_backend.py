@@ -0,0 +1,46 @@
+import importlib.util
+
+import pytest
+
+from intelisys import set_json_backend
+from intelisys.intelisys import json_dumps, json_loads, make_cache_key, reference_cache_key
+
+BACKENDS = ["json"] + [name for name in ("orjson", "ujson") if importlib.util.find_spec(name)]
+
+PARAMS = {
+    "model": "gpt-4o-mini",
+    "messages": [{"role": "user", "content": "Grüße, 東京  "}],
+    "temperature": 0.1,
+    "top_p": 1e16,
+    "logit_bias": {"50256": -1e-7},
+    "seed": 42,
+    "stream": True,
+}
+
+
+@pytest.fixture(autouse=True)
+def restore_backend():
+    yield
+    set_json_backend()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_cache_keys_do_not_depend_on_the_backend(backend):
+    set_json_backend("json")
+    expected = make_cache_key("openai", PARAMS), reference_cache_key(__file__, pages=[1, 2], ratio=1e16)
+    set_json_backend(backend)
+    assert (make_cache_key("openai", PARAMS), reference_cache_key(__file__, pages=[1, 2], ratio=1e16)) == expected
+
+
+def test_cache_key_ignores_transport_parameters():
+    params = {k: v for k, v in PARAMS.items() if k != "stream"}
+    assert make_cache_key("openai", params) == make_cache_key("openai", PARAMS)
+    assert make_cache_key("groq", params) != make_cache_key("openai", params)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_round_trip(backend):
+    set_json_backend(backend)
+    payload = dict(PARAMS, seed=2 ** 70)
+    assert json_loads(json_dumps(payload)) == payload
+    assert json_loads("[NaN]")[0] != json_loads("[NaN]")[0]
@@ -0,0 +1,66 @@
+"""
+Speed of the installed JSON backends on a typical JSON-mode reply and request.
+
+Each operation takes the best of several runs per backend. The bounds are generous: they catch a
+fast backend that silently falls back to the standard library, and cache keys whose cost starts
+depending on the backend. Measured here on a 14 KB reply: json loads 175 us and dumps 290 us,
+orjson 75 us and 50 us; make_cache_key 365 us with either backend.
+"""
+import importlib.util
+import time
+
+import pytest
+
+from intelisys import set_json_backend
+from intelisys.intelisys import json_dumps, json_loads, make_cache_key
+
+FAST_BACKENDS = [name for name in ("orjson", "ujson") if importlib.util.find_spec(name)]
+
+DOCUMENT = {"items": [{"id": i, "name": f"item {i}", "price": i * 1.25, "tags": ["a", "b"], "ok": True}
+                      for i in range(200)]}
+TEXT = json_dumps(DOCUMENT)
+PARAMS = {"model": "gpt-4o-mini", "temperature": 0,
+          "messages": [{"role": "user", "content": "word " * 2000} for _ in range(10)]}
+
+
+@pytest.fixture(autouse=True)
+def restore_backend():
+    yield
+    set_json_backend()
+
+
+def best_of(runs, func, repeat=100):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        timings.append((time.perf_counter() - start) / repeat)
+    return min(timings)
+
+
+def measure(backend):
+    set_json_backend(backend)
+    return {
+        "loads": best_of(5, lambda: json_loads(TEXT)),
+        "dumps": best_of(5, lambda: json_dumps(DOCUMENT)),
+        "cache_key": best_of(5, lambda: make_cache_key("openai", PARAMS)),
+    }
+
+
+def test_stdlib_backend():
+    timings = measure("json")
+    assert timings["loads"] < 5e-3
+    assert timings["dumps"] < 5e-3
+    assert timings["cache_key"] < 10e-3
+
+
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+def test_fast_backend_beats_stdlib(backend):
+    stdlib = measure("json")
+    fast = measure(backend)
+    assert json_loads(TEXT) == DOCUMENT
+    assert fast["loads"] < stdlib["loads"]
+    assert fast["dumps"] < stdlib["dumps"]
+    # Cache keys are always serialized with the standard library
+    assert fast["cache_key"] < 2 * stdlib["cache_key"]
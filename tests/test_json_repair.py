@@ -0,0 +1,139 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from intelisys import Intelisys, safe_json_loads, safe_json_loads_async
+from intelisys.intelisys import _json_repair_cache, repair_json
+
+
+def no_llm(prompt):
+    raise AssertionError(f"LLM repair should not be needed for: {prompt!r}")
+
+
+CORPUS = [
+    # Markdown fences and surrounding prose
+    ('```json\n{"a": 1,}\n```', {"a": 1}),
+    ('```\n[1, 2, 3]\n```', [1, 2, 3]),
+    ('Here is the JSON you asked for:\n```json\n{"name": "Bob"}\n```\nLet me know!', {"name": "Bob"}),
+    ('Sure! {"ok": true} Hope that helps.', {"ok": True}),
+    # Quoting and Python literals
+    ("{'a': 'b', 'c': [1, 2]}", {"a": "b", "c": [1, 2]}),
+    ("{'flag': True, 'other': False, 'missing': None}", {"flag": True, "other": False, "missing": None}),
+    ('{name: "Bob", age: 30}', {"name": "Bob", "age": 30}),
+    ("{'it\\'s': 'fine'}", {"it's": "fine"}),
+    ('{"quote": \'say "hi"\'}', {"quote": 'say "hi"'}),
+    # Trailing commas and comments
+    ('{"a": [1, 2, 3,],}', {"a": [1, 2, 3]}),
+    ('{\n  // the answer\n  "a": 42, /* inline */ "b": 1e5\n}', {"a": 42, "b": 1e5}),
+    # Raw newlines inside strings
+    ('{"text": "line one\nline two"}', {"text": "line one\nline two"}),
+    # Truncated output
+    ('{"a": 1, "b": [1, 2', {"a": 1, "b": [1, 2]}),
+    ('{"a": "unterminated', {"a": "unterminated"}),
+    ('{"a": 1, "b":', {"a": 1, "b": None}),
+    ('{"a": 1, "b', {"a": 1}),
+    ('{"a": tru', {"a": True}),
+    ('[1, fals', [1, False]),
+    ('{"a": nul', {"a": None}),
+    # Mismatched closing brackets
+    ('{"a": [1, 2}', {"a": [1, 2]}),
+]
+
+
+# Prose that merely contains brackets must not be turned into data by local repair
+PROSE = [
+    "Sorry, I cannot help with that [policy].",
+    "The options are [A] and [B].",
+    "See {section two} for details.",
+    '{"answer": maybe}',
+    "[1, 2, three]",
+]
+
+
+@pytest.mark.parametrize("text", PROSE)
+def test_prose_is_left_to_the_llm(text):
+    _json_repair_cache.clear()
+    with pytest.raises(ValueError):
+        json.loads(repair_json(text))
+    prompts = []
+
+    def repairer(prompt):
+        prompts.append(prompt)
+        return '{"fixed": true}'
+
+    assert safe_json_loads(text, repairer=repairer) == {"fixed": True}
+    assert len(prompts) == 1
+
+
+@pytest.mark.parametrize("text", PROSE)
+def test_prose_falls_back_to_content(text):
+    _json_repair_cache.clear()
+    result = safe_json_loads(text, repairer=lambda prompt: "still prose", max_attempts=1)
+    assert list(result) == ["content"]
+    assert text.endswith(result["content"])
+
+
+@pytest.mark.parametrize("text, expected", CORPUS)
+def test_safe_json_loads_repairs_locally(text, expected):
+    assert safe_json_loads(text, repairer=no_llm) == expected
+
+
+@pytest.mark.parametrize("text, expected", CORPUS)
+def test_repair_json_output_is_valid(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+def test_valid_json_is_returned_unchanged():
+    assert safe_json_loads('[{"a": 1}, {"b": [true, null]}]', repairer=no_llm) == [{"a": 1}, {"b": [True, None]}]
+
+
+def test_llm_repair_is_bounded_and_cached():
+    _json_repair_cache.clear()
+    prompts = []
+
+    def repairer(prompt):
+        prompts.append(prompt)
+        return "still not json" if len(prompts) == 1 else '{"name": "Bob"}'
+
+    assert safe_json_loads("name is Bob", repairer=repairer, max_attempts=3) == {"name": "Bob"}
+    assert len(prompts) == 2
+    assert prompts[1] == "Fix this JSON:\nstill not json"
+    assert safe_json_loads("name is Bob", repairer=no_llm) == {"name": "Bob"}
+
+
+def test_llm_repair_gives_up_after_max_attempts():
+    _json_repair_cache.clear()
+    prompts = []
+
+    def repairer(prompt):
+        prompts.append(prompt)
+        return "nope"
+
+    assert safe_json_loads("plain words", repairer=repairer, max_attempts=2) == {"content": "plain words"}
+    assert len(prompts) == 2
+
+
+def test_safe_json_loads_async_awaits_repairer():
+    _json_repair_cache.clear()
+
+    async def repairer(prompt):
+        return '{"fixed": true}'
+
+    result = asyncio.run(safe_json_loads_async("not json at all", repairer=repairer))
+    assert result == {"fixed": True}
+    assert asyncio.run(safe_json_loads_async('```json\n{"a": 1,}\n```', repairer=no_llm)) == {"a": 1}
+
+
+def test_template_chat_async_accepts_top_level_arrays():
+    pytest.importorskip("jinja2")
+    ai = Intelisys(provider="groq", api_key="test-key", json_mode=True, use_async=True, stream_sink=None)
+    message = SimpleNamespace(content='[{"a": 1}, {"a": 2}]', tool_calls=None)
+
+    async def create(**params):
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    ai._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    asyncio.run(ai.template_chat_async({"n": 2}, template="List {{n}} items"))
+    assert ai.last_response == [{"a": 1}, {"a": 2}]
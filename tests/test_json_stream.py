@@ -0,0 +1,104 @@
+import json
+import random
+import time
+
+import pytest
+
+from intelisys import JSONStreamParser
+
+ARRAYS = [
+    '[1, 2, 3]',
+    '[]',
+    '[{}, [], "", 0]',
+    '[{"a": [1, {"b": [2, 3]}], "c": {"d": {}}}, [[[]]], {"e": null}]',
+    '["say \\"hi\\"", "back\\\\slash", "\\\\", "\\\\\\"", "\\u00e9\\n\\t"]',
+    '["a, b", "[not] {a} container", "}]", "{[", ",,,", ":"]',
+    '[true, false, null, -1.5e-3, 1E+2, "日本語"]',
+    '[\n  {"id": 1, "tags": ["x", "y"]},\n  {"id": 2, "tags": []}\n]',
+]
+
+OBJECTS = [
+    '{"a": 1, "b": [1, 2, {"c": "d,e"}], "f": {"g": "}"}}',
+    '{}',
+    '{"quote \\" key": "value with \\\\ and ]", "empty": {}, "list": []}',
+    '{"nested": {"a": {"b": {"c": [1, [2, [3]]]}}}, "last": "x"}',
+]
+
+PREFIXES = ["", "Here is the JSON:\n```json\n", "Sure! "]
+SUFFIXES = ["", "\n```", "\nLet me know if you need more."]
+
+
+def random_chunks(text, rng, max_size=7):
+    chunks, i = [], 0
+    while i < len(text):
+        size = rng.randint(1, max_size)
+        chunks.append(text[i:i + size])
+        i += size
+    return chunks
+
+
+def parse(chunks):
+    parser = JSONStreamParser()
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    return items, parser
+
+
+def expected_items(document):
+    value = json.loads(document)
+    return list(value.items()) if isinstance(value, dict) else value
+
+
+@pytest.mark.parametrize("document", ARRAYS + OBJECTS)
+@pytest.mark.parametrize("prefix, suffix", list(zip(PREFIXES, SUFFIXES)))
+def test_random_chunk_boundaries(document, prefix, suffix):
+    rng = random.Random(document)
+    text = prefix + document + suffix
+    for _ in range(25):
+        items, parser = parse(random_chunks(text, rng))
+        assert items == expected_items(document)
+        assert parser.done
+
+
+@pytest.mark.parametrize("document", ARRAYS + OBJECTS)
+def test_one_character_chunks(document):
+    items, _ = parse(list(document))
+    assert items == expected_items(document)
+
+
+def test_items_are_emitted_as_soon_as_they_complete():
+    parser = JSONStreamParser()
+    assert parser.feed('[{"a": 1}') == []
+    assert parser.feed(', {"a"') == [{"a": 1}]
+    assert parser.feed(': 2}]') == [{"a": 2}]
+    assert parser.feed(', 3]') == []
+
+
+def test_object_fields_are_key_value_pairs():
+    items, parser = parse(['{"name": "Bob", "ag', 'e": 30}'])
+    assert items == [("name", "Bob"), ("age", 30)]
+    assert parser.container == "{"
+
+
+def test_text_without_json_yields_nothing():
+    items, parser = parse(["no json ", "here"])
+    assert items == []
+    assert not parser.done
+
+
+def test_invalid_item_raises():
+    with pytest.raises(ValueError):
+        parse(['[1, tru', 'e, nope]'])
+
+
+def test_large_item_is_linear():
+    # One 1 MB element in 16-character deltas: re-copying the unfinished item on every delta
+    # made this quadratic (seconds); buffering the pieces keeps it well under a second
+    value = "x" * 1_000_000
+    text = json.dumps([value, 1])
+    start = time.perf_counter()
+    items, _ = parse([text[i:i + 16] for i in range(0, len(text), 16)])
+    elapsed = time.perf_counter() - start
+    assert items == [value, 1]
+    assert elapsed < 1.5
@@ -0,0 +1,21 @@
+import pytest
+
+from intelisys.intelisys import parse_page_selection
+
+
+@pytest.mark.parametrize("pages, expected", [
+    ("1-3,5", [0, 1, 2, 4]),
+    ("8-", [7, 8, 9]),
+    ("-2", [0, 1]),
+    ("3, 1-3", [2, 0, 1]),
+    (4, [3]),
+    (range(1, 4), [0, 1, 2]),
+])
+def test_parse_page_selection(pages, expected):
+    assert parse_page_selection(pages, 10) == expected
+
+
+@pytest.mark.parametrize("pages", ["5-3", "a-b", "0", "11", "12-", [0], "9-11"])
+def test_parse_page_selection_rejects_invalid(pages):
+    with pytest.raises(ValueError):
+        parse_page_selection(pages, 10)
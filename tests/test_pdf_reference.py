@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+pytest.importorskip("PyPDF2")
+
+from intelisys import Intelisys
+
+PAGES = 96
+LINES_PER_PAGE = 40
+
+
+def page_text(page):
+    return [f"page{page} line{line} alpha beta gamma delta epsilon" for line in range(LINES_PER_PAGE)]
+
+
+def write_pdf(path, pages):
+    """Write a minimal uncompressed PDF with one Helvetica text block per page."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(1, pages + 1):
+        lines = b" T* ".join(b"(" + line.encode() + b") Tj" for line in page_text(page))
+        stream = b"BT /F1 10 Tf 12 TL 40 800 Td " + lines + b" ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects)))
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+@pytest.fixture(scope="module")
+def pdf(tmp_path_factory):
+    path = tmp_path_factory.mktemp("pdf") / "report.pdf"
+    write_pdf(path, PAGES)
+    return str(path)
+
+
+def reference_text(source, **kwargs):
+    ai = Intelisys(provider="openai", api_key="test-key")
+    ai.system_message = ""
+    ai.reference(source, **kwargs)
+    return ai.system_message
+
+
+def test_page_selection(pdf):
+    text = reference_text(pdf, pages="3,1-2", max_words=None)
+    assert text.index("page3 line0") < text.index("page1 line0") < text.index("page2 line0")
+    assert "page4 line0" not in text
+
+
+def test_word_budget_stops_extraction(pdf):
+    start = time.perf_counter()
+    reference_text(pdf, max_words=None)
+    full = time.perf_counter() - start
+    start = time.perf_counter()
+    text = reference_text(pdf, max_words=50)
+    budgeted = time.perf_counter() - start
+    assert "page1 line0" in text and "page2 line0" not in text
+    assert budgeted < full / 5
+
+
+def test_process_pool_preserves_page_order(pdf):
+    start = time.perf_counter()
+    serial = reference_text(pdf, pages=f"1-{PAGES}", max_words=None)
+    elapsed = time.perf_counter() - start
+    parallel = reference_text(pdf, pages=f"1-{PAGES}", max_words=None, workers=2)
+    assert parallel == serial
+    positions = [serial.index(f"page{page} line0 ") for page in range(1, PAGES + 1)]
+    assert positions == sorted(positions)
+    # About 1 ms per page here
+    assert elapsed / PAGES < 0.05
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from intelisys import RateLimiter, set_rate_limit
+from intelisys.intelisys import get_rate_limiter
+
+
+class FakeClock:
+    """Clock whose sleeps advance time instantly and are recorded."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def async_sleep(self, seconds):
+        self.sleep(seconds)
+
+
+def make_limiter(clock, **kwargs):
+    return RateLimiter(clock=clock, sleep=clock.sleep, async_sleep=clock.async_sleep, **kwargs)
+
+
+def test_requests_per_minute():
+    clock = FakeClock()
+    limiter = make_limiter(clock, requests_per_minute=60)
+    for _ in range(62):
+        limiter.acquire()
+    assert clock.sleeps == pytest.approx([1.0, 1.0])
+
+
+def test_bucket_refills_over_time():
+    clock = FakeClock()
+    limiter = make_limiter(clock, requests_per_minute=60)
+    for _ in range(60):
+        limiter.acquire()
+    clock.now += 30
+    for _ in range(30):
+        assert limiter.acquire() == 0
+    assert limiter.acquire() == pytest.approx(1.0)
+
+
+def test_tokens_per_minute():
+    clock = FakeClock()
+    limiter = make_limiter(clock, tokens_per_minute=6000)
+    assert limiter.acquire(tokens=6000) == 0
+    # 100 tokens per second refill
+    assert limiter.acquire(tokens=500) == pytest.approx(5.0)
+    assert clock.now == pytest.approx(5.0)
+
+
+def test_oversized_request_drains_the_bucket():
+    clock = FakeClock()
+    limiter = make_limiter(clock, tokens_per_minute=600)
+    assert limiter.acquire(tokens=10_000) == 0
+    assert limiter.acquire(tokens=10) == pytest.approx(1.0)
+
+
+def test_wait_is_the_longest_of_both_buckets():
+    clock = FakeClock()
+    limiter = make_limiter(clock, requests_per_minute=60, tokens_per_minute=600)
+    limiter.acquire(tokens=600)
+    assert limiter.acquire(tokens=100) == pytest.approx(10.0)
+
+
+def test_burst_limits_initial_capacity():
+    clock = FakeClock()
+    limiter = make_limiter(clock, requests_per_minute=60, burst=0.5)
+    waits = [limiter.acquire() for _ in range(31)]
+    assert waits[:30] == [0] * 30
+    assert waits[30] == pytest.approx(1.0)
+
+
+def test_acquire_async_uses_async_sleep():
+    clock = FakeClock()
+    limiter = make_limiter(clock, requests_per_minute=60)
+
+    async def run():
+        for _ in range(61):
+            await limiter.acquire_async()
+
+    asyncio.run(run())
+    assert clock.sleeps == pytest.approx([1.0])
+
+
+def test_set_rate_limit_falls_back_to_provider():
+    try:
+        provider_limiter = set_rate_limit("test-provider", requests_per_minute=10)
+        model_limiter = set_rate_limit("test-provider", "model-a", requests_per_minute=5)
+        assert get_rate_limiter("test-provider", "model-a") is model_limiter
+        assert get_rate_limiter("test-provider", "model-b") is provider_limiter
+        set_rate_limit("test-provider", "model-a")
+        assert get_rate_limiter("test-provider", "model-a") is provider_limiter
+    finally:
+        set_rate_limit("test-provider", "model-a")
+        set_rate_limit("test-provider")
+    assert get_rate_limiter("test-provider") is None
@@ -0,0 +1,82 @@
+"""
+Throughput of the streaming path with a fake provider stream of 100k chunks.
+
+The per-chunk bounds are generous (the loop costs well under a microsecond per chunk on a
+laptop); they catch per-chunk regressions such as re-resolving the extractor, string
+concatenation or flushing a sink on every delta.
+"""
+import time
+from types import SimpleNamespace
+
+from intelisys import CallbackSink, Intelisys
+
+CHUNKS = 100_000
+MAX_SECONDS_PER_CHUNK = 20e-6
+
+
+def openai_stream(n):
+    chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="tok "))]) for _ in range(n)]
+    # Trailing usage chunk without choices
+    chunks.append(SimpleNamespace(choices=[]))
+    return chunks
+
+
+def anthropic_stream(n):
+    chunks = [SimpleNamespace(type="message_start")]
+    chunks += [SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(text="tok ")) for _ in range(n)]
+    chunks.append(SimpleNamespace(type="message_stop"))
+    return chunks
+
+
+def fake_instance(provider, chunks):
+    ai = Intelisys(provider=provider, api_key="test-key", max_retry=1)
+    create = lambda **params: iter(chunks)
+    if provider == "anthropic":
+        ai._client = SimpleNamespace(messages=SimpleNamespace(create=create))
+    else:
+        ai._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return ai
+
+
+def best_of(runs, func):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def test_chat_stream_throughput():
+    ai = fake_instance("openai", openai_stream(CHUNKS))
+    count = 0
+
+    def consume():
+        nonlocal count
+        count = sum(1 for _ in ai.chat_stream("go"))
+
+    elapsed = best_of(3, consume)
+    assert count == CHUNKS
+    assert len(ai.last_response) == 4 * CHUNKS
+    assert elapsed / CHUNKS < MAX_SECONDS_PER_CHUNK
+
+
+def test_chat_stream_throughput_with_sink():
+    ai = fake_instance("openai", openai_stream(CHUNKS))
+    written = []
+
+    def consume():
+        written.clear()
+        for _ in ai.chat_stream("go", sink=CallbackSink(written.append)):
+            pass
+
+    elapsed = best_of(3, consume)
+    assert len(written) == CHUNKS
+    assert elapsed / CHUNKS < MAX_SECONDS_PER_CHUNK
+
+
+def test_anthropic_stream_throughput():
+    ai = fake_instance("anthropic", anthropic_stream(CHUNKS))
+    elapsed = best_of(3, lambda: list(ai.chat_stream("go")))
+    assert ai.last_response == "tok " * CHUNKS
+    assert elapsed / CHUNKS < MAX_SECONDS_PER_CHUNK
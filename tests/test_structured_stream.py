@@ -0,0 +1,116 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pydantic = pytest.importorskip("pydantic")
+
+from intelisys import Intelisys
+
+
+class City(pydantic.BaseModel):
+    name: str
+    population: int
+
+
+ARGUMENTS = ['{"name": ', '"Lima", ', '"population": 10', '000000}']
+EXPECTED = City(name="Lima", population=10_000_000)
+
+
+def anthropic_chunks():
+    chunks = [SimpleNamespace(type="message_start"),
+              SimpleNamespace(type="content_block_start",
+                              content_block=SimpleNamespace(type="tool_use", name="output"))]
+    chunks += [SimpleNamespace(type="content_block_delta",
+                               delta=SimpleNamespace(type="input_json_delta", partial_json=part))
+               for part in ARGUMENTS]
+    chunks += [SimpleNamespace(type="content_block_stop"), SimpleNamespace(type="message_stop")]
+    return chunks
+
+
+def tool_call_chunks():
+    def chunk(**delta):
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None, **delta))])
+    chunks = [chunk(tool_calls=[SimpleNamespace(index=0, function=SimpleNamespace(name="output", arguments=""))])]
+    chunks += [chunk(tool_calls=[SimpleNamespace(index=0, function=SimpleNamespace(name=None, arguments=part))])
+               for part in ARGUMENTS]
+    return chunks + [SimpleNamespace(choices=[])]
+
+
+def function_call_chunks():
+    def chunk(arguments):
+        function_call = SimpleNamespace(name=None, arguments=arguments)
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None, function_call=function_call))])
+    return [chunk(part) for part in ARGUMENTS]
+
+
+STREAMS = {"anthropic": anthropic_chunks, "groq": tool_call_chunks, "openrouter": tool_call_chunks,
+           "openai": function_call_chunks}
+
+
+def fake_instance(provider, use_async=False):
+    ai = Intelisys(provider=provider, api_key="test-key", max_history_words=1000, stream=True,
+                   stream_sink=None, use_async=use_async)
+    ai.set_output_model(City)
+    calls = []
+
+    def create(**params):
+        calls.append(params)
+        return iter(STREAMS[provider]())
+
+    async def create_async(**params):
+        calls.append(params)
+
+        async def stream():
+            for chunk in STREAMS[provider]():
+                yield chunk
+        return stream()
+
+    create = create_async if use_async else create
+    if provider == "anthropic":
+        ai._client = SimpleNamespace(messages=SimpleNamespace(create=create))
+    else:
+        ai._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return ai, calls
+
+
+@pytest.mark.parametrize("provider", sorted(STREAMS))
+def test_streamed_chat_returns_structured_output(provider):
+    ai, calls = fake_instance(provider)
+    response = ai.chat("largest city of Peru")
+    assert calls[0]["stream"] is True
+    assert json.loads(response) == EXPECTED.model_dump()
+    assert ai.structured_output == EXPECTED
+    assert json.loads(ai.history[-1]["content"]) == EXPECTED.model_dump()
+
+
+@pytest.mark.parametrize("provider", sorted(STREAMS))
+def test_chat_stream_returns_structured_output(provider):
+    ai, _ = fake_instance(provider)
+    assert list(ai.chat_stream("largest city of Peru")) == []
+    assert ai.structured_output == EXPECTED
+    assert json.loads(ai.last_response) == EXPECTED.model_dump()
+
+
+@pytest.mark.parametrize("provider", sorted(STREAMS))
+def test_streamed_chat_async_returns_structured_output(provider):
+    ai, _ = fake_instance(provider, use_async=True)
+
+    async def run():
+        await ai.chat_async("largest city of Peru")
+        deltas = [delta async for delta in ai.chat_stream_async("largest city of Peru")]
+        return deltas
+
+    assert asyncio.run(run()) == []
+    assert ai.structured_output == EXPECTED
+    assert json.loads(ai.last_response) == EXPECTED.model_dump()
+
+
+def test_streamed_text_is_unchanged_without_tool_deltas():
+    ai = Intelisys(provider="anthropic", api_key="test-key", stream=True, stream_sink=None)
+    chunks = [SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text=part))
+              for part in ("Hello", " world")]
+    ai._client = SimpleNamespace(messages=SimpleNamespace(create=lambda **params: iter(chunks)))
+    assert ai.chat("hi") == "Hello world"
+    assert ai.structured_output is None